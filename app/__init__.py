@@ -1,22 +1,153 @@
 """Flask application factory."""
 
 import os
+from threading import Lock
 
-from flask import Flask
+from cachetools import TTLCache
+from flask import Flask, current_app
+from sqlalchemy import event
+from sqlalchemy.orm import make_transient_to_detached
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
 from flask_migrate import Migrate
 from flask_login import LoginManager
 from flask_wtf.csrf import CSRFProtect
 
-db = SQLAlchemy()
+from app.json_provider import OrjsonProvider
+
+# Objects stay loaded after commit instead of being refreshed with another
+# SELECT on next access; server-generated columns already come back through
+# RETURNING because every model sets eager_defaults
+db = SQLAlchemy(session_options={"expire_on_commit": False})
 migrate = Migrate()
 login_manager = LoginManager()
 csrf = CSRFProtect()
 
+# Guards each app's user loader cache, kept in app.extensions["user_cache"].
+# It holds the column values of recently loaded users, so the user loader
+# does not have to query the users table on every request. Entries are
+# dropped once a write to the user row is committed (see app.models), but
+# only in the worker that wrote it; other workers keep theirs until the TTL
+# runs out.
+user_cache_lock = Lock()
+
+
+def forget_cached_user(user_id):
+    """Drop a user from the user loader cache."""
+    cache = current_app.extensions.get("user_cache")
+    if cache is not None:
+        with user_cache_lock:
+            cache.pop(user_id, None)
+
+
+def mark_user_stale(session, user_id):
+    """Drop a user from the user loader cache once ``session`` commits."""
+    session.info.setdefault("stale_user_ids", set()).add(user_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _forget_stale_users(session):
+    # Dropping the entry at flush time instead would let a request re-cache
+    # the row as it was before this commit
+    for user_id in session.info.pop("stale_user_ids", ()):
+        forget_cached_user(user_id)
+
+
+# Guards each app's dashboard cache, kept in app.extensions["dashboard_cache"],
+# and its generation, which counts how often the cache has been dropped.
+# Dashboard figures are the same for every user, so one copy is shared until
+# a write to a warehouse or item is committed (see app.models) or the TTL
+# runs out.
+dashboard_cache_lock = Lock()
+
+
+def forget_dashboard():
+    """Drop the cached dashboard figures."""
+    extensions = current_app.extensions
+    if "dashboard_cache" in extensions:
+        with dashboard_cache_lock:
+            extensions["dashboard_generation"] += 1
+            extensions["dashboard_cache"].clear()
+
+
+def get_cached_dashboard():
+    """Return the cached dashboard figures, or None, and the generation.
+
+    Pass the generation to ``store_dashboard`` along with figures built
+    after a miss.
+    """
+    extensions = current_app.extensions
+    with dashboard_cache_lock:
+        return (
+            extensions["dashboard_cache"].get("dashboard"),
+            extensions["dashboard_generation"],
+        )
+
+
+def store_dashboard(data, generation):
+    """Cache dashboard figures built since ``get_cached_dashboard``.
+
+    A write committed while they were being built has already dropped the
+    cache and moved the generation on; the figures may predate it, so they
+    are not stored.
+    """
+    extensions = current_app.extensions
+    with dashboard_cache_lock:
+        if extensions["dashboard_generation"] == generation:
+            extensions["dashboard_cache"]["dashboard"] = data
+
+
+def mark_dashboard_stale(session):
+    """Drop the cached dashboard figures once ``session`` commits."""
+    session.info["dashboard_stale"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _forget_stale_dashboard(session):
+    # Clearing at flush time instead would let another request rebuild the
+    # cache from the rows as they were before this commit
+    if session.info.pop("dashboard_stale", False):
+        forget_dashboard()
+
+
+def load_cached_user(user_id):
+    """Load a user, attaching a cached copy to the session when possible."""
+    from app.models import User
+
+    user_cache = current_app.extensions["user_cache"]
+    with user_cache_lock:
+        values = user_cache.get(user_id)
+
+    if values is None:
+        user = db.session.get(User, user_id)
+        if user is not None:
+            values = {
+                attr.key: getattr(user, attr.key)
+                for attr in db.inspect(User).column_attrs
+            }
+            with user_cache_lock:
+                user_cache[user_id] = values
+        return user
+
+    user = User(**values)
+    make_transient_to_detached(user)
+    return db.session.merge(user, load=False)
+
+
+def set_sqlite_pragmas(dbapi_connection, _connection_record):
+    """Tune each new SQLite connection for faster local writes."""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.execute("PRAGMA cache_size=-20000")
+    cursor.close()
+
 
 def create_app(config_name=None):
     """Create and configure the Flask application."""
     app = Flask(__name__)
+    app.json = OrjsonProvider(app)
 
     # Load configuration
     config_name = config_name or os.getenv("FLASK_ENV", "development")
@@ -24,9 +155,19 @@ def create_app(config_name=None):
 
     # Initialize extensions
     db.init_app(app)
+    if app.config["SQLALCHEMY_DATABASE_URI"].startswith("sqlite"):
+        with app.app_context():
+            event.listen(db.engine, "connect", set_sqlite_pragmas)
     migrate.init_app(app, db)
     login_manager.init_app(app)
     csrf.init_app(app)
+    app.extensions["user_cache"] = TTLCache(
+        maxsize=1024, ttl=app.config["USER_CACHE_TTL"]
+    )
+    app.extensions["dashboard_cache"] = TTLCache(
+        maxsize=1, ttl=app.config["DASHBOARD_CACHE_TTL"]
+    )
+    app.extensions["dashboard_generation"] = 0
 
     login_manager.login_view = "auth.login"
     login_manager.login_message = "Please log in to access this page."
@@ -48,14 +189,8 @@ def create_app(config_name=None):
     csrf.exempt(api_bp)
 
     # User loader for Flask-Login
-    from app.models import User
-
     @login_manager.user_loader
     def load_user(user_id):
-        return db.session.get(User, int(user_id))
-
-    # Create tables in development
-    with app.app_context():
-        db.create_all()
+        return load_cached_user(int(user_id))
 
     return app
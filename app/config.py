@@ -2,6 +2,7 @@
 
 import os
 from dotenv import load_dotenv
+from sqlalchemy.pool import StaticPool
 
 load_dotenv()
 
@@ -12,6 +13,10 @@ class Config:
     SECRET_KEY = os.getenv("SECRET_KEY", "dev-secret-key-change-in-production")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     WTF_CSRF_ENABLED = True
+    # Seconds another worker's writes can take to show on the dashboard
+    DASHBOARD_CACHE_TTL = int(os.getenv("DASHBOARD_CACHE_TTL", "30"))
+    # Seconds a deleted or demoted user keeps their access on other workers
+    USER_CACHE_TTL = int(os.getenv("USER_CACHE_TTL", "30"))
 
 
 class DevelopmentConfig(Config):
@@ -28,14 +33,46 @@ class TestingConfig(Config):
 
     TESTING = True
     SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+    # One shared connection, so every thread and session sees the same
+    # in-memory database
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        "poolclass": StaticPool,
+        "connect_args": {"check_same_thread": False},
+    }
     WTF_CSRF_ENABLED = False
 
 
+# gunicorn.conf.py exports the worker count it settled on
+_CONNECTIONS_PER_WORKER = max(
+    1,
+    int(os.getenv("DB_MAX_CONNECTIONS", "60"))
+    // int(os.getenv("WEB_CONCURRENCY", "1")),
+)
+
+
 class ProductionConfig(Config):
     """Production configuration."""
 
     DEBUG = False
+    # Compiled templates are cached; never stat template files per render
+    TEMPLATES_AUTO_RELOAD = False
     SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL")
+    # The pool is per gunicorn worker process and caps how many of the
+    # worker's greenlets can query at once. By default the workers share
+    # DB_MAX_CONNECTIONS, two thirds kept open and the rest as overflow.
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        "pool_pre_ping": True,
+        "pool_size": int(os.getenv(
+            "DB_POOL_SIZE",
+            str(_CONNECTIONS_PER_WORKER - _CONNECTIONS_PER_WORKER // 3),
+        )),
+        "max_overflow": int(os.getenv(
+            "DB_MAX_OVERFLOW", str(_CONNECTIONS_PER_WORKER // 3),
+        )),
+        "pool_recycle": 1800,
+        # Reuse the most recently returned connection so idle ones can expire
+        "pool_use_lifo": True,
+    }
 
     @classmethod
     def init_app(cls, app):
@@ -0,0 +1,29 @@
+"""JSON provider backed by orjson."""
+
+import orjson
+from flask.json.provider import DefaultJSONProvider
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """JSON provider that serializes responses with orjson.
+
+    Only ``jsonify`` responses go through orjson; ``dumps``/``loads`` stay on
+    the standard library so sessions and the ``tojson`` filter are unchanged.
+    """
+
+    def response(self, *args, **kwargs):
+        """Serialize the arguments as JSON and return a response."""
+        obj = self._prepare_response_obj(args, kwargs)
+        option = (
+            orjson.OPT_APPEND_NEWLINE
+            | orjson.OPT_NON_STR_KEYS
+            | orjson.OPT_UTC_Z
+        )
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            option |= orjson.OPT_INDENT_2
+        return self._app.response_class(
+            orjson.dumps(obj, default=self.default, option=option),
+            mimetype=self.mimetype,
+        )
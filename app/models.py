@@ -1,10 +1,62 @@
 """Database models for the warehouse application."""
 
-from datetime import datetime, timezone
+import os
+import sys
 from enum import Enum
-from werkzeug.security import generate_password_hash, check_password_hash
+from hmac import compare_digest
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerifyMismatchError
+from werkzeug.security import check_password_hash
 from flask_login import UserMixin
-from app import db
+from app import db, mark_dashboard_stale, mark_user_stale
+
+# Argon2id hasher, cost parameters can be tuned per deployment
+password_hasher = PasswordHasher(
+    time_cost=int(os.getenv("ARGON2_TIME_COST", "3")),
+    memory_cost=int(os.getenv("ARGON2_MEMORY_COST", "65536")),
+    parallelism=int(os.getenv("ARGON2_PARALLELISM", "2")),
+)
+
+
+def run_blocking(func, *args):
+    """Call ``func`` in gevent's native thread pool when running under gevent.
+
+    Password hashing holds the CPU for tens of milliseconds. On the gevent
+    hub that would stall every other request the worker is serving, while a
+    native thread lets them carry on, since the hashing releases the GIL.
+    Exceptions raised by ``func`` propagate as usual.
+    """
+    if "gevent" in sys.modules:
+        from gevent import get_hub, monkey
+
+        if monkey.is_module_patched("threading"):
+            # The pool logs exceptions raised in it, so a wrong password
+            # is handed back and re-raised here instead
+            error, result = get_hub().threadpool.apply(_capture, (func, args))
+            if error is not None:
+                raise error
+            return result
+    return func(*args)
+
+
+def _capture(func, args):
+    """Call ``func``, returning ``(exception, None)`` or ``(None, result)``."""
+    try:
+        return None, func(*args)
+    except Exception as error:  # pylint: disable=broad-exception-caught
+        return error, None
+
+
+def secrets_match(provided, expected):
+    """Compare an attacker-supplied secret to the expected value.
+
+    Uses a constant-time comparison so the time taken does not reveal how
+    many leading characters matched. Use this for every token, API key or
+    other secret check instead of ``==``.
+    """
+    if provided is None or expected is None:
+        return False
+    return compare_digest(provided.encode(), expected.encode())
 
 
 class Role(Enum):
@@ -30,6 +82,7 @@ class User(UserMixin, db.Model):
     """User model for authentication and authorization."""
 
     __tablename__ = "users"
+    __mapper_args__ = {"eager_defaults": True}
 
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
@@ -37,48 +90,84 @@ class User(UserMixin, db.Model):
     password_hash = db.Column(db.String(256), nullable=False)
     role = db.Column(db.String(20), default=Role.VIEWER.value, nullable=False)
     created_at = db.Column(
-        db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False
+        db.DateTime(timezone=True), server_default=db.func.now(), nullable=False
     )
     updated_at = db.Column(
-        db.DateTime,
-        default=lambda: datetime.now(timezone.utc),
-        onupdate=lambda: datetime.now(timezone.utc),
+        db.DateTime(timezone=True),
+        server_default=db.func.now(),
+        onupdate=db.func.now(),
         nullable=False,
     )
 
     # Relationships
     audit_logs = db.relationship("AuditLog", backref="user", lazy="dynamic")
 
+    # Roles allowed to edit and delete resources
+    _EDIT_ROLES = frozenset({Role.ADMIN.value, Role.MANAGER.value})
+    _DELETE_ROLES = frozenset({Role.ADMIN.value})
+
     def set_password(self, password):
         """Hash and set the user's password."""
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = run_blocking(password_hasher.hash, password)
 
     def check_password(self, password):
-        """Check if the provided password matches the hash."""
-        return check_password_hash(self.password_hash, password)
+        """Check if the provided password matches the hash.
+
+        Hashes created with older settings, or the legacy Werkzeug format,
+        are upgraded in place after a successful check.
+        """
+        try:
+            run_blocking(password_hasher.verify, self.password_hash, password)
+        except VerifyMismatchError:
+            return False
+        except InvalidHashError:
+            # Legacy Werkzeug hash from before the switch to argon2
+            if not run_blocking(
+                check_password_hash, self.password_hash, password
+            ):
+                return False
+            self.set_password(password)
+            return True
+
+        if password_hasher.check_needs_rehash(self.password_hash):
+            self.set_password(password)
+        return True
 
     def has_role(self, role):
-        """Check if user has the specified role."""
+        """Check if user has the specified role.
+
+        Roles are not secrets, so a plain comparison is fine here; secret
+        values must be compared with secrets_match instead.
+        """
         if isinstance(role, Role):
             role = role.value
         return self.role == role
 
     def can_edit(self):
         """Check if user can edit resources."""
-        return self.role in [Role.ADMIN.value, Role.MANAGER.value]
+        return self.role in User._EDIT_ROLES
 
     def can_delete(self):
         """Check if user can delete resources."""
-        return self.role == Role.ADMIN.value
+        return self.role in User._DELETE_ROLES
 
     def __repr__(self):
         return f"<User {self.username}>"
 
 
+@db.event.listens_for(User, "after_insert")
+@db.event.listens_for(User, "after_update")
+@db.event.listens_for(User, "after_delete")
+def _mark_user_stale(_mapper, _connection, target):
+    """Keep the user loader cache in step with writes to a user."""
+    mark_user_stale(db.object_session(target), target.id)
+
+
 class Warehouse(db.Model):
     """Warehouse model for storage locations."""
 
     __tablename__ = "warehouses"
+    __mapper_args__ = {"eager_defaults": True}
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
@@ -87,24 +176,31 @@ class Warehouse(db.Model):
     capacity = db.Column(db.Float)
     contact_person = db.Column(db.String(100))
     notes = db.Column(db.Text)
-    metadata_json = db.Column(db.JSON, default=dict)
+    # Only the JSON API reads metadata, so it is loaded on request
+    metadata_json = db.deferred(db.Column(db.JSON, default=dict))
     created_at = db.Column(
-        db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False
+        db.DateTime(timezone=True), server_default=db.func.now(), nullable=False
     )
     updated_at = db.Column(
-        db.DateTime,
-        default=lambda: datetime.now(timezone.utc),
-        onupdate=lambda: datetime.now(timezone.utc),
+        db.DateTime(timezone=True),
+        server_default=db.func.now(),
+        onupdate=db.func.now(),
         nullable=False,
     )
 
     # Relationships
     items = db.relationship(
-        "Item", backref="warehouse", lazy="dynamic", cascade="all, delete-orphan"
+        "Item", backref="warehouse", cascade="all, delete-orphan"
     )
 
     def get_total_quantity(self):
-        """Get total quantity of all items in this warehouse using aggregation."""
+        """Get total quantity of all items in this warehouse.
+
+        Sums the items collection when it is already loaded, otherwise
+        falls back to an aggregate query instead of loading every item.
+        """
+        if "items" not in db.inspect(self).unloaded:
+            return sum(item.quantity for item in self.items)
         result = db.session.query(db.func.sum(Item.quantity)).filter_by(
             warehouse_id=self.id
         ).scalar()
@@ -118,6 +214,7 @@ class Item(db.Model):
     """Item model for inventory entries."""
 
     __tablename__ = "items"
+    __mapper_args__ = {"eager_defaults": True}
 
     id = db.Column(db.Integer, primary_key=True)
     warehouse_id = db.Column(
@@ -130,42 +227,71 @@ class Item(db.Model):
     unit = db.Column(db.String(20), default="units")
     batch_number = db.Column(db.String(50))
     expiry_date = db.Column(db.Date)
-    metadata_json = db.Column(db.JSON, default=dict)
+    # Only the JSON API reads metadata, so it is loaded on request
+    metadata_json = db.deferred(db.Column(db.JSON, default=dict))
     created_at = db.Column(
-        db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False
+        db.DateTime(timezone=True), server_default=db.func.now(), nullable=False
     )
     updated_at = db.Column(
-        db.DateTime,
-        default=lambda: datetime.now(timezone.utc),
-        onupdate=lambda: datetime.now(timezone.utc),
+        db.DateTime(timezone=True),
+        server_default=db.func.now(),
+        onupdate=db.func.now(),
         nullable=False,
     )
 
-    # Unique constraint for SKU within a warehouse
     __table_args__ = (
+        # Unique constraint for SKU within a warehouse, also serves
+        # warehouse_id and (warehouse_id, sku) lookups
         db.UniqueConstraint("warehouse_id", "sku", name="unique_warehouse_sku"),
+        # Low stock filtering within a warehouse and across all of them
+        db.Index("ix_item_wh_qty", "warehouse_id", "quantity"),
+        db.Index("ix_item_quantity", "quantity"),
+        # Item listings are ordered by name
+        db.Index("ix_item_name", "name"),
     )
 
     def __repr__(self):
         return f"<Item {self.sku}: {self.name}>"
 
 
+@db.event.listens_for(Warehouse, "after_insert")
+@db.event.listens_for(Warehouse, "after_update")
+@db.event.listens_for(Warehouse, "after_delete")
+@db.event.listens_for(Item, "after_insert")
+@db.event.listens_for(Item, "after_update")
+@db.event.listens_for(Item, "after_delete")
+def _mark_dashboard_stale(_mapper, _connection, target):
+    """Keep the cached dashboard in step with writes to its rows."""
+    mark_dashboard_stale(db.object_session(target))
+
+
 class AuditLog(db.Model):
     """Audit log model for tracking changes."""
 
     __tablename__ = "audit_logs"
+    __mapper_args__ = {"eager_defaults": True}
 
     id = db.Column(db.Integer, primary_key=True)
     type = db.Column(db.String(20), nullable=False)
-    user_id = db.Column(db.Integer, db.ForeignKey("users.id"))
-    item_id = db.Column(db.Integer)
-    source_warehouse_id = db.Column(db.Integer)
-    destination_warehouse_id = db.Column(db.Integer)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), index=True)
+    item_id = db.Column(db.Integer, index=True)
+    source_warehouse_id = db.Column(db.Integer, index=True)
+    destination_warehouse_id = db.Column(db.Integer, index=True)
     quantity = db.Column(db.Float)
     notes = db.Column(db.Text)
     details_json = db.Column(db.JSON, default=dict)
     timestamp = db.Column(
-        db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False
+        db.DateTime(timezone=True),
+        server_default=db.func.now(),
+        nullable=False,
+    )
+
+    __table_args__ = (
+        # Newest-first listing and keyset seeks on (timestamp, id)
+        db.Index("ix_audit_ts_id", "timestamp", "id"),
+        # Type filtering with newest-first ordering; also serves type-only
+        # lookups
+        db.Index("ix_audit_type_ts", "type", "timestamp"),
     )
 
     def __repr__(self):
@@ -1 +1,18 @@
 """Routes package initialization."""
+
+from flask import get_flashed_messages, stream_template
+from flask_wtf.csrf import generate_csrf
+
+
+def stream_page(template_name, **context):
+    """Render a template as a streamed response.
+
+    The session cookie is sent before a streamed body is rendered, so every
+    session change the page would make happens up front. Flashed messages
+    are popped, and ``base.html`` reads them from the request instead of
+    leaving them behind for the next page. The CSRF token the page's forms
+    embed is created, so it is saved with the session.
+    """
+    get_flashed_messages()
+    generate_csrf()
+    return stream_template(template_name, **context)
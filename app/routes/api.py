@@ -1,12 +1,17 @@
 """REST API routes."""
 
+import base64
+from functools import wraps
+
 from flask import Blueprint, jsonify, request
 from flask_login import login_required, current_user
 from marshmallow import ValidationError
+from sqlalchemy.exc import IntegrityError
 
 from app.services import WarehouseService, ItemService, AuditService
 from app.schemas import (
     warehouse_schema,
+    warehouses_schema,
     item_schema,
     items_schema,
     transfer_schema,
@@ -21,34 +26,36 @@ def api_error(message, status_code=400):
     return jsonify({"error": message}), status_code
 
 
-def require_edit_permission(func):
-    """Decorator to require edit permission."""
-    from functools import wraps
+def encode_cursor(log_id):
+    """Encode an audit log ID as an opaque pagination cursor."""
+    return base64.urlsafe_b64encode(str(log_id).encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Decode a pagination cursor, raising ValueError if it is invalid."""
+    return int(base64.urlsafe_b64decode(cursor.encode()).decode())
+
+
+def _require_permission(permission_check):
+    """Build a decorator that requires the given User permission method."""
 
-    @wraps(func)
-    def decorated(*args, **kwargs):
-        if not current_user.is_authenticated:
-            return api_error("Authentication required", 401)
-        if not current_user.can_edit():
-            return api_error("Permission denied", 403)
-        return func(*args, **kwargs)
+    def decorator(func):
+        @wraps(func)
+        def decorated(*args, **kwargs):
+            if not current_user.is_authenticated:
+                return api_error("Authentication required", 401)
+            if not getattr(current_user, permission_check)():
+                return api_error("Permission denied", 403)
+            return func(*args, **kwargs)
 
-    return decorated
+        return decorated
 
+    return decorator
 
-def require_delete_permission(func):
-    """Decorator to require delete permission."""
-    from functools import wraps
 
-    @wraps(func)
-    def decorated(*args, **kwargs):
-        if not current_user.is_authenticated:
-            return api_error("Authentication required", 401)
-        if not current_user.can_delete():
-            return api_error("Permission denied", 403)
-        return func(*args, **kwargs)
+require_edit_permission = _require_permission("can_edit")
+require_delete_permission = _require_permission("can_delete")
 
-    return decorated
 
 @api_bp.route("/warehouses", methods=["GET"])
 @login_required
@@ -56,11 +63,11 @@ def list_warehouses():
     """List all warehouses."""
     search = request.args.get("search")
     warehouse_data = WarehouseService.get_all_with_totals(search=search)
-    result = []
-    for data in warehouse_data:
-        w_data = warehouse_schema.dump(data["warehouse"])
+    result = warehouses_schema.dump(
+        [data["warehouse"] for data in warehouse_data]
+    )
+    for w_data, data in zip(result, warehouse_data):
         w_data["total_quantity"] = data["total_quantity"]
-        result.append(w_data)
     return jsonify(result)
 
 
@@ -73,11 +80,10 @@ def create_warehouse():
     except ValidationError as err:
         return api_error(err.messages, 400)
 
-    # Check if code exists
-    if WarehouseService.get_by_code(data["code"]):
+    try:
+        warehouse = WarehouseService.create(data, user=current_user)
+    except IntegrityError:
         return api_error("Warehouse code already exists", 409)
-
-    warehouse = WarehouseService.create(data, user=current_user)
     return jsonify(warehouse_schema.dump(warehouse)), 201
 
 
@@ -85,12 +91,12 @@ def create_warehouse():
 @login_required
 def get_warehouse(warehouse_id):
     """Get a specific warehouse."""
-    warehouse = WarehouseService.get_by_id(warehouse_id)
+    warehouse = WarehouseService.get_by_id(warehouse_id, with_metadata=True)
     if not warehouse:
         return api_error("Warehouse not found", 404)
 
     data = warehouse_schema.dump(warehouse)
-    data["total_quantity"] = warehouse.get_total_quantity()
+    data["total_quantity"] = WarehouseService.get_total_quantity(warehouse_id)
     return jsonify(data)
 
 
@@ -107,13 +113,10 @@ def update_warehouse(warehouse_id):
     except ValidationError as err:
         return api_error(err.messages, 400)
 
-    # Check if code is taken by another warehouse
-    if "code" in data:
-        existing = WarehouseService.get_by_code(data["code"])
-        if existing and existing.id != warehouse.id:
-            return api_error("Warehouse code already exists", 409)
-
-    warehouse = WarehouseService.update(warehouse, data, user=current_user)
+    try:
+        warehouse = WarehouseService.update(warehouse, data, user=current_user)
+    except IntegrityError:
+        return api_error("Warehouse code already exists", 409)
     return jsonify(warehouse_schema.dump(warehouse))
 
 
@@ -173,7 +176,7 @@ def create_item(warehouse_id):
 @login_required
 def get_item(warehouse_id, item_id):
     """Get a specific item."""
-    item = ItemService.get_by_id(item_id)
+    item = ItemService.get_by_id(item_id, with_metadata=True)
     if not item or item.warehouse_id != warehouse_id:
         return api_error("Item not found", 404)
 
@@ -256,9 +259,12 @@ def transfer_items():
 @api_bp.route("/audit", methods=["GET"])
 @login_required
 def list_audit_logs():
-    """List audit logs with pagination."""
-    page = request.args.get("page", 1, type=int)
-    per_page = min(request.args.get("per_page", 50, type=int), 100)
+    """List audit logs with pagination.
+
+    Pass the ``next_cursor`` of a response as ``cursor`` to fetch the next
+    page with keyset pagination; ``page`` keeps working for offset paging.
+    """
+    per_page = max(1, min(request.args.get("per_page", 50, type=int), 100))
 
     filters = {}
     if request.args.get("type"):
@@ -268,6 +274,25 @@ def list_audit_logs():
     if request.args.get("warehouse_id"):
         filters["warehouse_id"] = request.args.get("warehouse_id", type=int)
 
+    cursor = request.args.get("cursor")
+    if cursor:
+        try:
+            last_id = decode_cursor(cursor)
+        except ValueError:
+            return api_error("Invalid cursor", 400)
+
+        logs, has_more = AuditService.get_logs_after(
+            last_id=last_id, per_page=per_page, filters=filters or None
+        )
+        return jsonify(
+            {
+                "items": audit_logs_schema.dump(logs),
+                "per_page": per_page,
+                "next_cursor": encode_cursor(logs[-1].id) if has_more else None,
+            }
+        )
+
+    page = request.args.get("page", 1, type=int)
     pagination = AuditService.get_logs(
         page=page, per_page=per_page, filters=filters if filters else None
     )
@@ -279,6 +304,9 @@ def list_audit_logs():
             "page": pagination.page,
             "per_page": pagination.per_page,
             "pages": pagination.pages,
+            "next_cursor": encode_cursor(pagination.items[-1].id)
+            if pagination.has_next
+            else None,
         }
     )
 
@@ -3,14 +3,20 @@
 from flask import Blueprint, render_template, redirect, url_for, flash, request
 from flask_login import login_user, logout_user, login_required, current_user
 from flask_wtf import FlaskForm
+from sqlalchemy import or_
 from wtforms import StringField, PasswordField, BooleanField, SelectField
 from wtforms.validators import DataRequired, Email, Length, EqualTo
+from argon2.exceptions import VerificationError
 
 from app import db
-from app.models import User, Role
+from app.models import User, Role, password_hasher, run_blocking
 
 auth_bp = Blueprint("auth", __name__)
 
+# Compared against when the username does not exist, so that failed logins
+# take the same time whether or not the account exists.
+_DUMMY_HASH = password_hasher.hash("invalid-placeholder")
+
 
 class LoginForm(FlaskForm):
     """Form for user login."""
@@ -56,6 +62,22 @@ class CreateUserForm(FlaskForm):
     )
 
 
+def find_user_conflict(username, email):
+    """Return an error message if the username or email is already taken."""
+    conflict = (
+        User.query.with_entities(User.username, User.email)
+        .filter(or_(User.username == username, User.email == email))
+        # Report a taken username first when both fields collide
+        .order_by((User.username == username).desc())
+        .first()
+    )
+    if not conflict:
+        return None
+    if conflict.username == username:
+        return "Username already exists"
+    return "Email already registered"
+
+
 @auth_bp.route("/login", methods=["GET", "POST"])
 def login():
     """User login page."""
@@ -65,7 +87,21 @@ def login():
     form = LoginForm()
     if form.validate_on_submit():
         user = User.query.filter_by(username=form.username.data).first()
-        if user and user.check_password(form.password.data):
+        if user:
+            password_ok = user.check_password(form.password.data)
+        else:
+            # Pay the same hashing cost for unknown usernames
+            try:
+                run_blocking(
+                    password_hasher.verify, _DUMMY_HASH, form.password.data
+                )
+            except VerificationError:
+                pass
+            password_ok = False
+        if password_ok:
+            if db.session.is_modified(user):
+                # check_password upgraded an outdated hash
+                db.session.commit()
             login_user(user, remember=form.remember_me.data)
             next_page = request.args.get("next")
             if next_page and next_page.startswith("/"):
@@ -93,13 +129,9 @@ def register():
 
     form = RegisterForm()
     if form.validate_on_submit():
-        # Check if username or email already exists
-        if User.query.filter_by(username=form.username.data).first():
-            flash("Username already exists", "error")
-            return render_template("auth/register.html", form=form)
-
-        if User.query.filter_by(email=form.email.data).first():
-            flash("Email already registered", "error")
+        conflict = find_user_conflict(form.username.data, form.email.data)
+        if conflict:
+            flash(conflict, "error")
             return render_template("auth/register.html", form=form)
 
         user = User(
@@ -137,12 +169,9 @@ def create_user():
 
     form = CreateUserForm()
     if form.validate_on_submit():
-        if User.query.filter_by(username=form.username.data).first():
-            flash("Username already exists", "error")
-            return render_template("auth/create_user.html", form=form)
-
-        if User.query.filter_by(email=form.email.data).first():
-            flash("Email already registered", "error")
+        conflict = find_user_conflict(form.username.data, form.email.data)
+        if conflict:
+            flash(conflict, "error")
             return render_template("auth/create_user.html", form=form)
 
         user = User(
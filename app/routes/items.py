@@ -6,6 +6,7 @@ from flask_wtf import FlaskForm
 from wtforms import StringField, FloatField, TextAreaField, SelectField, DateField
 from wtforms.validators import DataRequired, Length, Optional, NumberRange
 
+from app.routes import stream_page
 from app.services import WarehouseService, ItemService
 
 items_bp = Blueprint("items", __name__)
@@ -146,12 +147,11 @@ def transfer_item(item_id):
             url_for("warehouses.view_warehouse", warehouse_id=item.warehouse_id)
         )
 
-    # Get available destination warehouses
-    all_warehouses = WarehouseService.get_all()
     destination_choices = [
-        (w.id, f"{w.name} ({w.code})")
-        for w in all_warehouses
-        if w.id != item.warehouse_id
+        (warehouse_id, f"{name} ({code})")
+        for warehouse_id, name, code in WarehouseService.choices_excluding(
+            item.warehouse_id
+        )
     ]
 
     form = TransferForm()
@@ -184,6 +184,11 @@ def transfer_item(item_id):
 @login_required
 def search_items():
     """Search items across all warehouses."""
-    search = request.args.get("search", "")
-    items = ItemService.get_all(search=search if search else None)
-    return render_template("items/search.html", items=items, search=search)
+    search = request.args.get("search") or None
+    # Stream the rows so a broad search never builds the whole result list
+    return stream_page(
+        "items/search.html",
+        items=ItemService.iter_all(search=search, with_details=False),
+        item_count=ItemService.count(search=search),
+        search=search or "",
+    )
@@ -3,10 +3,14 @@
 from flask import Blueprint, render_template, redirect, url_for
 from flask_login import login_required, current_user
 
+from app import get_cached_dashboard, store_dashboard
 from app.services import WarehouseService, ItemService
 
 main_bp = Blueprint("main", __name__)
 
+# Number of low stock alerts listed on the dashboard
+DASHBOARD_ALERT_LIMIT = 10
+
 
 @main_bp.route("/")
 def index():
@@ -16,17 +20,44 @@ def index():
     return render_template("index.html")
 
 
+def _dashboard_data():
+    """Build the dashboard figures as plain values that can be cached."""
+    # Low stock counts come with the warehouse totals; only the alerts that
+    # are actually listed get loaded. Their warehouses are already in the
+    # session, so item.warehouse never needs another query.
+    warehouses = [
+        {
+            "warehouse": {
+                "id": row["warehouse"].id,
+                "name": row["warehouse"].name,
+                "code": row["warehouse"].code,
+                "capacity": row["warehouse"].capacity,
+            },
+            "item_count": row["item_count"],
+            "low_stock_count": row["low_stock_count"],
+        }
+        for row in WarehouseService.get_all_with_totals(with_details=False)
+    ]
+    low_stock_items = [
+        {
+            "name": item.name,
+            "sku": item.sku,
+            "quantity": item.quantity,
+            "unit": item.unit,
+            "warehouse": {"name": item.warehouse.name},
+        }
+        for item in ItemService.get_low_stock(limit=DASHBOARD_ALERT_LIMIT)
+    ]
+    return {"warehouses": warehouses, "low_stock_items": low_stock_items}
+
+
 @main_bp.route("/dashboard")
 @login_required
 def dashboard():
     """Main dashboard showing warehouse overview."""
-    warehouses = WarehouseService.get_all()
-
-    # Get low stock items (quantity <= 10)
-    low_stock_items = ItemService.get_all(filters={"low_stock": 10})
+    data, generation = get_cached_dashboard()
+    if data is None:
+        data = _dashboard_data()
+        store_dashboard(data, generation)
 
-    return render_template(
-        "dashboard.html",
-        warehouses=warehouses,
-        low_stock_items=low_stock_items,
-    )
+    return render_template("dashboard.html", **data)
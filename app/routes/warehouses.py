@@ -3,9 +3,11 @@
 from flask import Blueprint, render_template, redirect, url_for, flash, request
 from flask_login import login_required, current_user
 from flask_wtf import FlaskForm
+from sqlalchemy.exc import IntegrityError
 from wtforms import StringField, FloatField, TextAreaField
 from wtforms.validators import DataRequired, Length, Optional, NumberRange
 
+from app.routes import stream_page
 from app.services import WarehouseService, ItemService
 
 warehouses_bp = Blueprint("warehouses", __name__)
@@ -31,7 +33,9 @@ class WarehouseForm(FlaskForm):
 def list_warehouses():
     """List all warehouses."""
     search = request.args.get("search", "")
-    warehouses = WarehouseService.get_all(search=search if search else None)
+    warehouses = WarehouseService.get_all_with_totals(
+        search=search if search else None, with_details=False
+    )
     return render_template(
         "warehouses/list.html", warehouses=warehouses, search=search
     )
@@ -47,11 +51,6 @@ def create_warehouse():
 
     form = WarehouseForm()
     if form.validate_on_submit():
-        # Check if code already exists
-        if WarehouseService.get_by_code(form.code.data):
-            flash("Warehouse code already exists", "error")
-            return render_template("warehouses/create.html", form=form)
-
         data = {
             "name": form.name.data,
             "code": form.code.data,
@@ -60,7 +59,12 @@ def create_warehouse():
             "contact_person": form.contact_person.data,
             "notes": form.notes.data,
         }
-        warehouse = WarehouseService.create(data, user=current_user)
+        try:
+            warehouse = WarehouseService.create(data, user=current_user)
+        except IntegrityError:
+            # The unique constraint on code is the only one the form can hit
+            flash("Warehouse code already exists", "error")
+            return render_template("warehouses/create.html", form=form)
         flash(f"Warehouse '{warehouse.name}' created successfully!", "success")
         return redirect(url_for("warehouses.view_warehouse", warehouse_id=warehouse.id))
 
@@ -76,12 +80,16 @@ def view_warehouse(warehouse_id):
         flash("Warehouse not found", "error")
         return redirect(url_for("warehouses.list_warehouses"))
 
-    search = request.args.get("search", "")
-    items = ItemService.get_all(
-        warehouse_id=warehouse_id, search=search if search else None
-    )
-    return render_template(
-        "warehouses/view.html", warehouse=warehouse, items=items, search=search
+    search = request.args.get("search") or None
+    # Stream the rows so large warehouses never build the whole item list
+    return stream_page(
+        "warehouses/view.html",
+        warehouse=warehouse,
+        items=ItemService.iter_all(
+            warehouse_id=warehouse_id, search=search, with_details=False
+        ),
+        item_count=ItemService.count(warehouse_id=warehouse_id, search=search),
+        search=search or "",
     )
 
 
@@ -100,14 +108,6 @@ def edit_warehouse(warehouse_id):
 
     form = WarehouseForm(obj=warehouse)
     if form.validate_on_submit():
-        # Check if code is taken by another warehouse
-        existing = WarehouseService.get_by_code(form.code.data)
-        if existing and existing.id != warehouse.id:
-            flash("Warehouse code already exists", "error")
-            return render_template(
-                "warehouses/edit.html", form=form, warehouse=warehouse
-            )
-
         data = {
             "name": form.name.data,
             "code": form.code.data,
@@ -116,7 +116,13 @@ def edit_warehouse(warehouse_id):
             "contact_person": form.contact_person.data,
             "notes": form.notes.data,
         }
-        WarehouseService.update(warehouse, data, user=current_user)
+        try:
+            WarehouseService.update(warehouse, data, user=current_user)
+        except IntegrityError:
+            flash("Warehouse code already exists", "error")
+            return render_template(
+                "warehouses/edit.html", form=form, warehouse=warehouse
+            )
         flash("Warehouse updated successfully!", "success")
         return redirect(url_for("warehouses.view_warehouse", warehouse_id=warehouse.id))
 
@@ -1,9 +1,20 @@
 """Marshmallow schemas for request/response validation."""
 
-from marshmallow import Schema, fields, validate, validates, ValidationError
+from marshmallow import EXCLUDE, Schema, fields, validate
 
 
-class UserSchema(Schema):
+class BaseSchema(Schema):
+    """Base schema with options shared by all schemas."""
+
+    class Meta:
+        """Schema options."""
+
+        # Ignore unknown and dump-only keys, so a payload fetched from the
+        # API can be sent back as an update without stripping it first
+        unknown = EXCLUDE
+
+
+class UserSchema(BaseSchema):
     """Schema for User model."""
 
     id = fields.Int(dump_only=True)
@@ -18,14 +29,17 @@ class UserSchema(Schema):
     updated_at = fields.DateTime(dump_only=True)
 
 
-class WarehouseSchema(Schema):
+class WarehouseSchema(BaseSchema):
     """Schema for Warehouse model."""
 
     id = fields.Int(dump_only=True)
     name = fields.Str(required=True, validate=validate.Length(min=1, max=100))
     code = fields.Str(required=True, validate=validate.Length(min=1, max=50))
     address = fields.Str(validate=validate.Length(max=255), allow_none=True)
-    capacity = fields.Float(allow_none=True)
+    capacity = fields.Float(
+        allow_none=True,
+        validate=validate.Range(min=0, error="Capacity must be non-negative."),
+    )
     contact_person = fields.Str(validate=validate.Length(max=100), allow_none=True)
     notes = fields.Str(allow_none=True)
     metadata_json = fields.Dict(load_default=dict)
@@ -33,14 +47,8 @@ class WarehouseSchema(Schema):
     updated_at = fields.DateTime(dump_only=True)
     total_quantity = fields.Float(dump_only=True)
 
-    @validates("capacity")
-    def validate_capacity(self, value):
-        """Validate capacity is non-negative."""
-        if value is not None and value < 0:
-            raise ValidationError("Capacity must be non-negative.")
 
-
-class ItemSchema(Schema):
+class ItemSchema(BaseSchema):
     """Schema for Item model."""
 
     id = fields.Int(dump_only=True)
@@ -48,7 +56,10 @@ class ItemSchema(Schema):
     sku = fields.Str(required=True, validate=validate.Length(min=1, max=50))
     name = fields.Str(required=True, validate=validate.Length(min=1, max=100))
     description = fields.Str(allow_none=True)
-    quantity = fields.Float(required=True)
+    quantity = fields.Float(
+        required=True,
+        validate=validate.Range(min=0, error="Quantity must be non-negative."),
+    )
     unit = fields.Str(validate=validate.Length(max=20), load_default="units")
     batch_number = fields.Str(validate=validate.Length(max=50), allow_none=True)
     expiry_date = fields.Date(allow_none=True)
@@ -56,35 +67,31 @@ class ItemSchema(Schema):
     created_at = fields.DateTime(dump_only=True)
     updated_at = fields.DateTime(dump_only=True)
 
-    @validates("quantity")
-    def validate_quantity(self, value):
-        """Validate quantity is non-negative."""
-        if value < 0:
-            raise ValidationError("Quantity must be non-negative.")
-
 
-class TransferSchema(Schema):
+class TransferSchema(BaseSchema):
     """Schema for item transfer operations."""
 
     source_warehouse_id = fields.Int(required=True)
     destination_warehouse_id = fields.Int(required=True)
     item_id = fields.Int(required=True)
-    quantity = fields.Float(required=True)
+    quantity = fields.Float(
+        required=True,
+        validate=validate.Range(
+            min=0,
+            min_inclusive=False,
+            error="Transfer quantity must be positive.",
+        ),
+    )
     notes = fields.Str(allow_none=True)
 
-    @validates("quantity")
-    def validate_quantity(self, value):
-        """Validate transfer quantity is positive."""
-        if value <= 0:
-            raise ValidationError("Transfer quantity must be positive.")
-
 
-class AuditLogSchema(Schema):
+class AuditLogSchema(BaseSchema):
     """Schema for AuditLog model."""
 
     id = fields.Int(dump_only=True)
     type = fields.Str(dump_only=True)
     user_id = fields.Int(dump_only=True)
+    username = fields.Str(attribute="user.username", dump_only=True)
     item_id = fields.Int(dump_only=True)
     source_warehouse_id = fields.Int(dump_only=True)
     destination_warehouse_id = fields.Int(dump_only=True)
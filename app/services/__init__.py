@@ -1,68 +1,187 @@
 """Service layer for business logic."""
 
-from app import db
+from functools import wraps
+
+from sqlalchemy import (
+    exists, func, insert, literal_column, select, tuple_, update,
+)
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import aliased, load_only, selectinload, undefer
+
+from app import db, mark_dashboard_stale
 from app.models import Warehouse, Item, AuditLog, AuditType
 
+# Dialect-specific INSERT constructs that support ON CONFLICT upserts
+_DIALECT_INSERTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+
+# Items at or below this quantity are reported as low on stock
+LOW_STOCK_THRESHOLD = 10
+
+# Columns the HTML listings render; ``with_details=False`` loads only these
+# (plus the primary key) and leaves the rest of each row unloaded
+_WAREHOUSE_LISTING_COLUMNS = (
+    Warehouse.name, Warehouse.code, Warehouse.address, Warehouse.capacity,
+)
+_ITEM_LISTING_COLUMNS = (
+    Item.warehouse_id, Item.sku, Item.name, Item.quantity, Item.unit,
+    Item.batch_number, Item.expiry_date,
+)
+
+# Separator and fallback are inlined as SQL literals so the expression matches
+# the trigram indexes created in migration 7c2e4a91d5b3 on PostgreSQL.
+_SEARCH_SEPARATOR = literal_column("' '")
+_SEARCH_EMPTY = literal_column("''")
+
+
+def _search_document(*columns):
+    """Concatenate ``columns`` into the single expression the search matches.
+
+    Nullable columns are wrapped in COALESCE so a missing value doesn't null
+    out the whole document.
+    """
+    parts = [
+        column if not column.nullable else func.coalesce(column, _SEARCH_EMPTY)
+        for column in (c.expression for c in columns)
+    ]
+    document = parts[0]
+    for part in parts[1:]:
+        document = document + _SEARCH_SEPARATOR + part
+    return document
+
+
+def transactional(method):
+    """Commit the session after ``method`` succeeds, roll back if it fails.
+
+    The mutation and its audit entry are flushed by a single commit, and a
+    failure part way through can never leave an orphaned audit row behind.
+    """
+
+    @wraps(method)
+    def wrapper(*args, **kwargs):
+        try:
+            result = method(*args, **kwargs)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return result
+
+    return wrapper
+
 
 class WarehouseService:
     """Service for warehouse operations."""
 
     @staticmethod
-    def get_all(search=None, filters=None):
-        """Get all warehouses with optional filtering."""
-        query = Warehouse.query
+    def _filter_conditions(search=None, filters=None):
+        """Build the WHERE conditions shared by the warehouse listings."""
+        conditions = []
 
         if search:
-            search_term = f"%{search}%"
-            query = query.filter(
-                db.or_(
-                    Warehouse.name.ilike(search_term),
-                    Warehouse.code.ilike(search_term),
-                    Warehouse.address.ilike(search_term),
-                )
+            conditions.append(
+                _search_document(
+                    Warehouse.name, Warehouse.code, Warehouse.address
+                ).ilike(f"%{search}%")
             )
 
         if filters:
             if filters.get("capacity_min"):
-                query = query.filter(
-                    Warehouse.capacity >= filters["capacity_min"]
-                )
+                conditions.append(Warehouse.capacity >= filters["capacity_min"])
             if filters.get("capacity_max"):
-                query = query.filter(
-                    Warehouse.capacity <= filters["capacity_max"]
-                )
+                conditions.append(Warehouse.capacity <= filters["capacity_max"])
 
-        return query.order_by(Warehouse.name).all()
+        return conditions
 
     @staticmethod
-    def get_all_with_totals(search=None):
-        """Get all warehouses with quantity totals in a single query."""
-        warehouses = WarehouseService.get_all(search=search)
-        if not warehouses:
-            return []
-
-        # Get all totals in a single query
-        totals = (
-            db.session.query(
-                Item.warehouse_id, db.func.sum(Item.quantity).label("total")
-            )
-            .group_by(Item.warehouse_id)
+    def _listing_options(with_details=True):
+        """Build loader options for warehouse listings."""
+        if with_details:
+            return [undefer(Warehouse.metadata_json)]
+        return [load_only(*_WAREHOUSE_LISTING_COLUMNS)]
+
+    @staticmethod
+    def get_all(search=None, filters=None):
+        """Get all warehouses with optional filtering."""
+        conditions = WarehouseService._filter_conditions(search, filters)
+        return (
+            Warehouse.query.filter(*conditions)
+            .order_by(Warehouse.name)
             .all()
         )
-        totals_dict = {t.warehouse_id: t.total or 0 for t in totals}
-
-        result = []
-        for w in warehouses:
-            result.append({
-                "warehouse": w,
-                "total_quantity": totals_dict.get(w.id, 0),
-            })
-        return result
 
     @staticmethod
-    def get_by_id(warehouse_id):
-        """Get a warehouse by ID."""
-        return db.session.get(Warehouse, warehouse_id)
+    def get_all_with_totals(search=None, filters=None, with_details=True):
+        """Get all warehouses with item counts and quantity totals.
+
+        Everything, including how many items are low on stock, comes from a
+        single aggregate query, so listings never have to load the items
+        themselves.
+        """
+        conditions = WarehouseService._filter_conditions(search, filters)
+        stmt = (
+            select(
+                Warehouse,
+                func.count(Item.id),
+                func.coalesce(func.sum(Item.quantity), 0),
+                func.count(Item.id).filter(
+                    Item.quantity <= LOW_STOCK_THRESHOLD
+                ),
+            )
+            .outerjoin(Item)
+            .where(*conditions)
+            .options(*WarehouseService._listing_options(with_details))
+            .group_by(Warehouse.id)
+            .order_by(Warehouse.name)
+        )
+        return [
+            {
+                "warehouse": warehouse,
+                "item_count": item_count,
+                "total_quantity": total,
+                "low_stock_count": low_stock_count,
+            }
+            for warehouse, item_count, total, low_stock_count
+            in db.session.execute(stmt)
+        ]
+
+    @staticmethod
+    def get_total_quantity(warehouse_id):
+        """Get the total quantity of items in a warehouse."""
+        total = db.session.execute(
+            select(func.sum(Item.quantity)).where(
+                Item.warehouse_id == warehouse_id
+            )
+        ).scalar()
+        return total or 0.0
+
+    @staticmethod
+    def get_by_id(warehouse_id, with_items=False, with_metadata=False):
+        """Get a warehouse by ID.
+
+        Repeated lookups within a request are answered from the session
+        identity map without another query. Pass ``with_items=True`` to
+        batch-load the warehouse's items along with it, and
+        ``with_metadata=True`` to load the deferred metadata column up front.
+        """
+        options = []
+        if with_items:
+            options.append(selectinload(Warehouse.items))
+        if with_metadata:
+            options.append(undefer(Warehouse.metadata_json))
+        return db.session.get(Warehouse, warehouse_id, options=options)
+
+    @staticmethod
+    def choices_excluding(exclude_id):
+        """Get ``(id, name, code)`` rows for every other warehouse, by name."""
+        return db.session.execute(
+            select(Warehouse.id, Warehouse.name, Warehouse.code)
+            .where(Warehouse.id != exclude_id)
+            .order_by(Warehouse.name)
+        ).all()
 
     @staticmethod
     def get_by_code(code):
@@ -70,6 +189,7 @@ class WarehouseService:
         return Warehouse.query.filter_by(code=code).first()
 
     @staticmethod
+    @transactional
     def create(data, user=None):
         """Create a new warehouse."""
         warehouse = Warehouse(
@@ -82,7 +202,7 @@ class WarehouseService:
             metadata_json=data.get("metadata_json", {}),
         )
         db.session.add(warehouse)
-        db.session.commit()
+        db.session.flush()
 
         # Log the creation
         AuditService.log(
@@ -95,6 +215,7 @@ class WarehouseService:
         return warehouse
 
     @staticmethod
+    @transactional
     def update(warehouse, data, user=None):
         """Update an existing warehouse."""
         old_values = {
@@ -108,8 +229,6 @@ class WarehouseService:
             if key in data:
                 setattr(warehouse, key, data[key])
 
-        db.session.commit()
-
         # Log the update
         AuditService.log(
             audit_type=AuditType.UPDATE,
@@ -125,15 +244,18 @@ class WarehouseService:
         return warehouse
 
     @staticmethod
+    @transactional
     def delete(warehouse, user=None):
         """Delete a warehouse."""
-        # Check if warehouse has items
-        if warehouse.items.count() > 0:
+        # Check if warehouse has items, stopping at the first match
+        has_items = db.session.query(
+            exists().where(Item.warehouse_id == warehouse.id)
+        ).scalar()
+        if has_items:
             raise ValueError("Cannot delete warehouse with items")
 
         warehouse_info = {"id": warehouse.id, "code": warehouse.code}
         db.session.delete(warehouse)
-        db.session.commit()
 
         # Log the deletion
         AuditService.log(
@@ -148,20 +270,23 @@ class ItemService:
     """Service for item operations."""
 
     @staticmethod
-    def get_all(warehouse_id=None, search=None, filters=None):
-        """Get all items with optional filtering."""
+    def _filtered_query(warehouse_id=None, search=None, filters=None,
+                        with_details=True):
+        """Build the item query shared by the listings and their counts."""
         query = Item.query
 
+        if with_details:
+            query = query.options(undefer(Item.metadata_json))
+        else:
+            query = query.options(load_only(*_ITEM_LISTING_COLUMNS))
+
         if warehouse_id:
             query = query.filter_by(warehouse_id=warehouse_id)
 
         if search:
-            search_term = f"%{search}%"
             query = query.filter(
-                db.or_(
-                    Item.name.ilike(search_term),
-                    Item.sku.ilike(search_term),
-                    Item.description.ilike(search_term),
+                _search_document(Item.name, Item.sku, Item.description).ilike(
+                    f"%{search}%"
                 )
             )
 
@@ -171,14 +296,74 @@ class ItemService:
             if filters.get("batch_number"):
                 query = query.filter_by(batch_number=filters["batch_number"])
 
-        return query.order_by(Item.name).all()
+        return query
+
+    @staticmethod
+    def get_all(warehouse_id=None, search=None, filters=None,
+                with_details=True):
+        """Get all items with optional filtering.
+
+        Pass ``with_details=False`` for listings, so only the columns they
+        render are selected.
+        """
+        return (
+            ItemService._filtered_query(
+                warehouse_id, search, filters, with_details
+            )
+            .order_by(Item.name)
+            .all()
+        )
+
+    @staticmethod
+    def iter_all(warehouse_id=None, search=None, filters=None,
+                 with_details=True, batch_size=500):
+        """Iterate over matching items, fetching ``batch_size`` rows at a time.
+
+        Takes the same arguments as ``get_all``, but never holds more than
+        one batch of rows at once, so large listings can be streamed.
+        """
+        return (
+            ItemService._filtered_query(
+                warehouse_id, search, filters, with_details
+            )
+            .order_by(Item.name)
+            .yield_per(batch_size)
+        )
+
+    @staticmethod
+    def get_low_stock(limit=None):
+        """Get items at or below the low stock threshold, lowest first."""
+        query = ItemService._filtered_query(
+            filters={"low_stock": LOW_STOCK_THRESHOLD}, with_details=False
+        ).order_by(Item.quantity, Item.name)
+        if limit:
+            query = query.limit(limit)
+        return query.all()
+
+    @staticmethod
+    def count(warehouse_id=None, search=None, filters=None):
+        """Count the items ``get_all`` would return for the same filters.
+
+        Counts the filtered rows directly instead of wrapping the listing
+        query, whose columns and loader options a count does not need.
+        """
+        query = ItemService._filtered_query(
+            warehouse_id, search, filters, with_details=False
+        )
+        return query.order_by(None).with_entities(func.count()).scalar()
 
     @staticmethod
-    def get_by_id(item_id):
-        """Get an item by ID."""
-        return db.session.get(Item, item_id)
+    def get_by_id(item_id, with_metadata=False):
+        """Get an item by ID.
+
+        Pass ``with_metadata=True`` to load the deferred metadata column up
+        front.
+        """
+        options = [undefer(Item.metadata_json)] if with_metadata else []
+        return db.session.get(Item, item_id, options=options)
 
     @staticmethod
+    @transactional
     def create(data, user=None):
         """Create a new item."""
         item = Item(
@@ -193,7 +378,7 @@ class ItemService:
             metadata_json=data.get("metadata_json", {}),
         )
         db.session.add(item)
-        db.session.commit()
+        db.session.flush()
 
         # Log the creation
         AuditService.log(
@@ -209,6 +394,7 @@ class ItemService:
         return item
 
     @staticmethod
+    @transactional
     def update(item, data, user=None):
         """Update an existing item."""
         old_quantity = item.quantity
@@ -218,8 +404,6 @@ class ItemService:
             if key in data:
                 setattr(item, key, data[key])
 
-        db.session.commit()
-
         # Log quantity changes
         if "quantity" in data and data["quantity"] != old_quantity:
             AuditService.log(
@@ -238,6 +422,7 @@ class ItemService:
         return item
 
     @staticmethod
+    @transactional
     def delete(item, user=None):
         """Delete an item."""
         item_info = {
@@ -246,7 +431,6 @@ class ItemService:
             "warehouse_id": item.warehouse_id,
         }
         db.session.delete(item)
-        db.session.commit()
 
         # Log the deletion
         AuditService.log(
@@ -259,47 +443,65 @@ class ItemService:
         )
 
     @staticmethod
+    @transactional
     def transfer(source_warehouse_id, destination_warehouse_id, item_id,
                  quantity, user=None, notes=None):
-        """Transfer items between warehouses."""
-        source_item = Item.query.filter_by(
-            warehouse_id=source_warehouse_id, id=item_id
-        ).first()
+        """Transfer items between warehouses.
+
+        The source quantity is decremented with a guarded UPDATE and the
+        destination row is upserted, so no read-modify-write window exists
+        between checking the quantity and moving it.
+        """
+        if source_warehouse_id == destination_warehouse_id:
+            # The upsert would land on the source row and undo the decrement
+            raise ValueError("Source and destination warehouses must differ")
+
+        source_item = db.session.execute(
+            update(Item)
+            .where(
+                Item.id == item_id,
+                Item.warehouse_id == source_warehouse_id,
+                Item.quantity >= quantity,
+            )
+            .values(quantity=Item.quantity - quantity)
+            .returning(Item)
+            .options(undefer(Item.metadata_json)),
+            execution_options={"populate_existing": True},
+        ).scalar_one_or_none()
 
         if not source_item:
-            raise ValueError("Item not found in source warehouse")
-
-        if source_item.quantity < quantity:
+            # Only the failure path needs to find out why nothing matched
+            item = db.session.get(Item, item_id)
+            if not item or item.warehouse_id != source_warehouse_id:
+                raise ValueError("Item not found in source warehouse")
             raise ValueError("Insufficient quantity for transfer")
 
-        # Check if item exists in destination
-        dest_item = Item.query.filter_by(
-            warehouse_id=destination_warehouse_id, sku=source_item.sku
-        ).first()
-
-        # Decrease source quantity
-        source_item.quantity -= quantity
-
-        if dest_item:
-            # Add to existing item in destination
-            dest_item.quantity += quantity
-        else:
-            # Create new item in destination
-            dest_item = Item(
-                warehouse_id=destination_warehouse_id,
-                sku=source_item.sku,
-                name=source_item.name,
-                description=source_item.description,
-                quantity=quantity,
-                unit=source_item.unit,
-                batch_number=source_item.batch_number,
-                expiry_date=source_item.expiry_date,
-                metadata_json=source_item.metadata_json.copy()
-                if source_item.metadata_json else {},
-            )
-            db.session.add(dest_item)
+        dialect_insert = _DIALECT_INSERTS[db.session.get_bind().dialect.name]
+        stmt = dialect_insert(Item).values(
+            warehouse_id=destination_warehouse_id,
+            sku=source_item.sku,
+            name=source_item.name,
+            description=source_item.description,
+            quantity=quantity,
+            unit=source_item.unit,
+            batch_number=source_item.batch_number,
+            expiry_date=source_item.expiry_date,
+            metadata_json=source_item.metadata_json or {},
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Item.warehouse_id, Item.sku],
+            set_={
+                "quantity": Item.quantity + stmt.excluded.quantity,
+                "updated_at": func.now(),
+            },
+        )
+        dest_item = db.session.execute(
+            stmt.returning(Item).options(undefer(Item.metadata_json)),
+            execution_options={"populate_existing": True},
+        ).scalar_one()
 
-        db.session.commit()
+        # Bulk statements bypass the mapper events that clear the dashboard
+        mark_dashboard_stale(db.session)
 
         # Log the transfer
         AuditService.log(
@@ -323,43 +525,123 @@ class ItemService:
 class AuditService:
     """Service for audit log operations."""
 
+    @staticmethod
+    def _entry_values(audit_type, user=None, item_id=None,
+                      source_warehouse_id=None, destination_warehouse_id=None,
+                      quantity=None, notes=None, details=None):
+        """Map ``log`` arguments onto AuditLog column values."""
+        return {
+            "type": (
+                audit_type.value
+                if isinstance(audit_type, AuditType) else audit_type
+            ),
+            "user_id": user.id if user else None,
+            "item_id": item_id,
+            "source_warehouse_id": source_warehouse_id,
+            "destination_warehouse_id": destination_warehouse_id,
+            "quantity": quantity,
+            "notes": notes,
+            "details_json": details or {},
+        }
+
     @staticmethod
     def log(audit_type, user=None, item_id=None, source_warehouse_id=None,
             destination_warehouse_id=None, quantity=None, notes=None,
-            details=None):
-        """Create an audit log entry."""
+            details=None, commit=False):
+        """Create an audit log entry.
+
+        By default the entry is only added to the session, so it is
+        committed in the same transaction as the change it records. Pass
+        ``commit=True`` for entries that are not part of another change.
+        """
         entry = AuditLog(
-            type=audit_type.value if isinstance(audit_type, AuditType) else audit_type,
-            user_id=user.id if user else None,
-            item_id=item_id,
-            source_warehouse_id=source_warehouse_id,
-            destination_warehouse_id=destination_warehouse_id,
-            quantity=quantity,
-            notes=notes,
-            details_json=details or {},
+            **AuditService._entry_values(
+                audit_type,
+                user=user,
+                item_id=item_id,
+                source_warehouse_id=source_warehouse_id,
+                destination_warehouse_id=destination_warehouse_id,
+                quantity=quantity,
+                notes=notes,
+                details=details,
+            )
         )
         db.session.add(entry)
-        db.session.commit()
+        if commit:
+            db.session.commit()
         return entry
 
     @staticmethod
-    def get_logs(page=1, per_page=50, filters=None):
-        """Get audit logs with pagination and optional filtering."""
-        query = AuditLog.query
+    def log_many(entries):
+        """Create several audit log entries with a single bulk INSERT.
+
+        Each entry is a dict of the keyword arguments ``log`` takes. As with
+        ``log``, nothing is committed, so bulk operations record their audit
+        trail in the same transaction as the changes themselves.
+        """
+        if not entries:
+            return
+        db.session.execute(
+            insert(AuditLog),
+            [AuditService._entry_values(**entry) for entry in entries],
+        )
+
+    @staticmethod
+    def _base_query(filters=None):
+        """Build the filtered, newest-first audit log query."""
+        query = select(AuditLog).options(selectinload(AuditLog.user))
 
         if filters:
             if filters.get("type"):
-                query = query.filter_by(type=filters["type"])
+                query = query.where(AuditLog.type == filters["type"])
             if filters.get("user_id"):
-                query = query.filter_by(user_id=filters["user_id"])
+                query = query.where(AuditLog.user_id == filters["user_id"])
             if filters.get("warehouse_id"):
-                query = query.filter(
+                query = query.where(
                     db.or_(
                         AuditLog.source_warehouse_id == filters["warehouse_id"],
                         AuditLog.destination_warehouse_id == filters["warehouse_id"],
                     )
                 )
 
-        return query.order_by(AuditLog.timestamp.desc()).paginate(
-            page=page, per_page=per_page, error_out=False
+        return query.order_by(AuditLog.timestamp.desc(), AuditLog.id.desc())
+
+    @staticmethod
+    def get_logs(page=1, per_page=50, filters=None):
+        """Get audit logs with pagination and optional filtering."""
+        return db.paginate(
+            AuditService._base_query(filters),
+            page=page,
+            per_page=per_page,
+            error_out=False,
         )
+
+    @staticmethod
+    def get_logs_after(last_id=None, per_page=50, filters=None):
+        """Get the audit logs that follow the entry with the given ID.
+
+        Keyset pagination: instead of skipping OFFSET rows, the query seeks
+        straight past the last entry of the previous page, so deep pages
+        cost the same as the first one. Returns the entries and whether
+        more entries follow.
+        """
+        query = AuditService._base_query(filters)
+
+        if last_id is not None:
+            # Compare against the stored timestamp of the last entry, so
+            # the value never round-trips through Python
+            last = aliased(AuditLog)
+            last_timestamp = (
+                select(last.timestamp)
+                .where(last.id == last_id)
+                .scalar_subquery()
+            )
+            # A row-value comparison, unlike the equivalent OR of two
+            # conditions, lets the (timestamp, id) index seek to the cursor
+            query = query.where(
+                tuple_(AuditLog.timestamp, AuditLog.id)
+                < tuple_(last_timestamp, last_id)
+            )
+
+        logs = db.session.scalars(query.limit(per_page + 1)).all()
+        return logs[:per_page], len(logs) > per_page
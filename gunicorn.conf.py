@@ -0,0 +1,23 @@
+"""Gunicorn configuration, loaded automatically from the working directory."""
+
+import multiprocessing
+import os
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+# The app splits its database connection budget across the workers
+os.environ["WEB_CONCURRENCY"] = str(workers)
+
+# Requests spend their time waiting on the database, so cooperative gevent
+# workers keep many of them in flight per process. Concurrency is then
+# bounded by the SQLAlchemy pool rather than the worker count.
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gevent")
+worker_connections = int(os.getenv("GUNICORN_WORKER_CONNECTIONS", "1000"))
+
+
+def post_fork(server, worker):
+    """Make psycopg2 yield to other greenlets while it waits on a query."""
+    if worker_class == "gevent":
+        from psycogreen.gevent import patch_psycopg
+
+        patch_psycopg()
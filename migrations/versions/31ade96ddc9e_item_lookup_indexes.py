@@ -0,0 +1,40 @@
+"""item lookup indexes
+
+Revision ID: 31ade96ddc9e
+Revises: 59ec07a383d0
+Create Date: 2026-10-15 22:20:47.574152
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '31ade96ddc9e'
+down_revision = '59ec07a383d0'
+branch_labels = None
+depends_on = None
+
+ITEM_INDEXES = {
+    'ix_item_name': ['name'],
+    'ix_item_quantity': ['quantity'],
+    'ix_item_wh_qty': ['warehouse_id', 'quantity'],
+}
+
+
+def upgrade():
+    # Build the indexes without locking items against writes on PostgreSQL
+    with op.get_context().autocommit_block():
+        for name, columns in ITEM_INDEXES.items():
+            op.create_index(
+                name, 'items', columns, unique=False,
+                postgresql_concurrently=True,
+            )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name in ITEM_INDEXES:
+            op.drop_index(
+                name, table_name='items', postgresql_concurrently=True
+            )
@@ -0,0 +1,60 @@
+"""server side timestamps
+
+Revision ID: 3f1d2b7c9a64
+Revises: 94a5f618c152
+Create Date: 2026-10-15 22:12:05.118372
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1d2b7c9a64'
+down_revision = '94a5f618c152'
+branch_labels = None
+depends_on = None
+
+TIMESTAMP_COLUMNS = {
+    'users': ['created_at', 'updated_at'],
+    'warehouses': ['created_at', 'updated_at'],
+    'items': ['created_at', 'updated_at'],
+    'audit_logs': ['timestamp'],
+}
+
+
+def _utc(column):
+    """Convert between naive UTC values and timestamptz on PostgreSQL.
+
+    The existing values are naive UTC times; without an explicit USING they
+    would be read in the session time zone.
+    """
+    return f'"{column}" AT TIME ZONE \'UTC\''
+
+
+def upgrade():
+    for table, columns in TIMESTAMP_COLUMNS.items():
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            for column in columns:
+                batch_op.alter_column(
+                    column,
+                    existing_type=sa.DateTime(),
+                    type_=sa.DateTime(timezone=True),
+                    server_default=sa.func.now(),
+                    existing_nullable=False,
+                    postgresql_using=_utc(column),
+                )
+
+
+def downgrade():
+    for table, columns in TIMESTAMP_COLUMNS.items():
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            for column in columns:
+                batch_op.alter_column(
+                    column,
+                    existing_type=sa.DateTime(timezone=True),
+                    type_=sa.DateTime(),
+                    server_default=None,
+                    existing_nullable=False,
+                    postgresql_using=_utc(column),
+                )
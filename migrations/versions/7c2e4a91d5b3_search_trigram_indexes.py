@@ -0,0 +1,48 @@
+"""search trigram indexes
+
+Revision ID: 7c2e4a91d5b3
+Revises: 31ade96ddc9e
+Create Date: 2026-10-15 22:41:08.512337
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c2e4a91d5b3'
+down_revision = '31ade96ddc9e'
+branch_labels = None
+depends_on = None
+
+# Must stay in step with the expressions built by _search_document in
+# app/services, otherwise the planner can't match them to the index.
+SEARCH_INDEXES = {
+    'ix_item_search_trgm': (
+        'items', "name || ' ' || sku || ' ' || coalesce(description, '')"
+    ),
+    'ix_warehouse_search_trgm': (
+        'warehouses', "name || ' ' || code || ' ' || coalesce(address, '')"
+    ),
+}
+
+
+def upgrade():
+    # Trigram GIN indexes are PostgreSQL-only; other backends keep scanning
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, (table, expression) in SEARCH_INDEXES.items():
+        op.execute(
+            f'CREATE INDEX {name} ON {table} '
+            f'USING gin (({expression}) gin_trgm_ops)'
+        )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    for name in SEARCH_INDEXES:
+        op.execute(f'DROP INDEX IF EXISTS {name}')
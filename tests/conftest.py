@@ -1,20 +1,111 @@
 """Test configuration and fixtures."""
 
+import os
+
 import pytest
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+
+# Minimal Argon2 cost parameters. They are read when app.models is
+# imported, so they must be set first; hashes are still real argon2id.
+os.environ.setdefault("ARGON2_TIME_COST", "1")
+os.environ.setdefault("ARGON2_MEMORY_COST", "8")
+os.environ.setdefault("ARGON2_PARALLELISM", "1")
+
+# pylint: disable=wrong-import-position
 from app import create_app, db
 from app.models import User, Warehouse, Item, Role
 
 
-@pytest.fixture(scope="function")
+class ConnectionBoundSession(Session):
+    """Session that always uses the connection it was created with.
+
+    Flask-SQLAlchemy's session picks an engine for each statement, which
+    would bypass the per-test transaction.
+    """
+
+    def get_bind(self, *args, **kwargs):
+        return self.bind
+
+
+@pytest.fixture(scope="session")
 def app():
-    """Create application for testing."""
+    """Create the application and its schema once for the whole session."""
     app = create_app("testing")
     with app.app_context():
+        # pysqlite mishandles SAVEPOINT unless it leaves transactions to us
+        @event.listens_for(db.engine, "connect")
+        def _disable_pysqlite_transactions(dbapi_connection, _record):
+            dbapi_connection.isolation_level = None
+
+        @event.listens_for(db.engine, "begin")
+        def _begin(connection):
+            connection.exec_driver_sql("BEGIN")
+
         db.create_all()
-    yield app
+    return app
+
+
+@pytest.fixture(scope="session", autouse=True)
+def users(app):
+    """Create the admin, manager and viewer users once for the session.
+
+    Password hashing is deliberately slow, so the users are committed
+    before any test transaction starts and shared by every test; changes a
+    test makes to them are rolled back with the rest of its data.
+    """
     with app.app_context():
-        db.session.remove()
-        db.drop_all()
+        created = []
+        for role in (Role.ADMIN, Role.MANAGER, Role.VIEWER):
+            user = User(
+                username=role.value, email=f"{role.value}@test.com", role=role.value
+            )
+            user.set_password("password123")
+            db.session.add(user)
+            created.append(user)
+        db.session.commit()
+        return {user.username: {"id": user.id, "username": user.username}
+                for user in created}
+
+
+@pytest.fixture(autouse=True)
+def database(app):
+    """Run every test inside a transaction that is rolled back afterwards.
+
+    Commits made by the application only release a savepoint, so each
+    test starts from the empty schema without recreating it.
+    """
+    with app.app_context():
+        connection = db.engine.connect()
+    transaction = connection.begin()
+
+    session_factory = db.session.session_factory
+    default_class, default_options = session_factory.class_, session_factory.kw
+    session_factory.class_ = ConnectionBoundSession
+    session_factory.kw = {
+        **default_options,
+        "bind": connection,
+        "join_transaction_mode": "create_savepoint",
+    }
+    yield
+
+    session_factory.class_, session_factory.kw = default_class, default_options
+    transaction.rollback()
+    connection.close()
+    # The rollback fires no mapper events, so drop what the caches saw
+    app.extensions["dashboard_cache"].clear()
+    app.extensions["user_cache"].clear()
+
+
+@pytest.fixture
+def app_ctx(app):
+    """Push an application context for tests that use the database directly.
+
+    Tests that make requests must not hold one, because requests would then
+    share it, along with its session and ``g``, instead of getting their own.
+    """
+    with app.app_context():
+        yield
 
 
 @pytest.fixture
@@ -30,36 +121,27 @@ def runner(app):
 
 
 @pytest.fixture
-def admin_user(app):
-    """Create admin user."""
-    with app.app_context():
-        user = User(username="admin", email="admin@test.com", role=Role.ADMIN.value)
-        user.set_password("password123")
-        db.session.add(user)
-        db.session.commit()
-        return {"id": user.id, "username": "admin"}
+def admin_user(users):
+    """Admin user."""
+    return users["admin"]
 
 
 @pytest.fixture
-def manager_user(app):
-    """Create manager user."""
-    with app.app_context():
-        user = User(username="manager", email="manager@test.com", role=Role.MANAGER.value)
-        user.set_password("password123")
-        db.session.add(user)
-        db.session.commit()
-        return {"id": user.id, "username": "manager"}
+def manager_user(users):
+    """Manager user."""
+    return users["manager"]
 
 
 @pytest.fixture
-def viewer_user(app):
-    """Create viewer user."""
-    with app.app_context():
-        user = User(username="viewer", email="viewer@test.com", role=Role.VIEWER.value)
-        user.set_password("password123")
-        db.session.add(user)
-        db.session.commit()
-        return {"id": user.id, "username": "viewer"}
+def viewer_user(users):
+    """Viewer user."""
+    return users["viewer"]
+
+
+@pytest.fixture
+def admin_client(client, admin_user):
+    """Test client already logged in as the admin user."""
+    return login_as(client, admin_user)
 
 
 @pytest.fixture
@@ -78,6 +160,16 @@ def sample_warehouse(app, admin_user):
         return {"id": warehouse.id, "code": warehouse.code}
 
 
+@pytest.fixture
+def dest_warehouse(app):
+    """Create an empty warehouse to transfer items into."""
+    with app.app_context():
+        warehouse = Warehouse(name="Destination", code="WH-DEST")
+        db.session.add(warehouse)
+        db.session.commit()
+        return {"id": warehouse.id, "code": warehouse.code}
+
+
 @pytest.fixture
 def sample_item(app, sample_warehouse):
     """Create sample item."""
@@ -100,6 +192,16 @@ def sample_item(app, sample_warehouse):
         }
 
 
+def insert_rows(app, model, rows):
+    """Insert many rows of a model with one executemany and one commit.
+
+    Goes through Core, so no mapper events fire for the new rows.
+    """
+    with app.app_context():
+        db.session.execute(db.insert(model), rows)
+        db.session.commit()
+
+
 def login(client, username, password):
     """Helper function to log in."""
     return client.post(
@@ -109,6 +211,18 @@ def login(client, username, password):
     )
 
 
+def login_as(client, user):
+    """Log the client in as user without going through the login form.
+
+    Writes the Flask-Login session keys directly, which skips the password
+    check and the dashboard render that follows a form login.
+    """
+    with client.session_transaction() as session:
+        session["_user_id"] = str(user["id"])
+        session["_fresh"] = True
+    return client
+
+
 def logout(client):
     """Helper function to log out."""
     return client.get("/auth/logout", follow_redirects=True)
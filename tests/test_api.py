@@ -2,7 +2,9 @@
 
 import pytest
 import json
-from conftest import login
+from conftest import login_as
+from app import db
+from app.models import Item
 
 
 class TestWarehouseAPI:
@@ -13,76 +15,116 @@ class TestWarehouseAPI:
         response = client.get("/api/warehouses")
         assert response.status_code == 302  # Redirect to login
 
-    def test_list_warehouses(self, client, admin_user):
+    def test_list_warehouses(self, admin_client):
         """Test listing warehouses."""
-        login(client, "admin", "password123")
-        response = client.get("/api/warehouses")
+        response = admin_client.get("/api/warehouses")
         assert response.status_code == 200
         data = json.loads(response.data)
         assert isinstance(data, list)
 
-    def test_create_warehouse(self, client, admin_user):
+    def test_list_warehouses_includes_totals(self, admin_client, sample_item):
+        """Test that listed warehouses include their item quantity totals."""
+        response = admin_client.get("/api/warehouses")
+        assert response.status_code == 200
+        data = json.loads(response.data)
+        assert len(data) == 1
+        assert data[0]["total_quantity"] == 100.0
+
+    def test_search_warehouses(self, admin_client, sample_warehouse):
+        """Test searching warehouses by code."""
+        response = admin_client.get("/api/warehouses?search=wh-0")
+        assert [w["code"] for w in json.loads(response.data)] == ["WH-001"]
+
+        response = admin_client.get("/api/warehouses?search=missing")
+        assert json.loads(response.data) == []
+
+    def test_create_warehouse(self, admin_client):
         """Test creating a warehouse."""
-        login(client, "admin", "password123")
-        response = client.post(
+        response = admin_client.post(
             "/api/warehouses",
-            data=json.dumps({"name": "New Warehouse", "code": "WH-NEW"}),
-            content_type="application/json",
+            json={"name": "New Warehouse", "code": "WH-NEW"},
         )
         assert response.status_code == 201
         data = json.loads(response.data)
         assert data["name"] == "New Warehouse"
         assert data["code"] == "WH-NEW"
 
-    def test_create_warehouse_duplicate_code(self, client, admin_user, sample_warehouse):
+    def test_create_warehouse_duplicate_code(self, admin_client, sample_warehouse):
         """Test creating warehouse with duplicate code."""
-        login(client, "admin", "password123")
-        response = client.post(
+        response = admin_client.post(
             "/api/warehouses",
-            data=json.dumps({"name": "Another Warehouse", "code": "WH-001"}),
-            content_type="application/json",
+            json={"name": "Another Warehouse", "code": "WH-001"},
         )
         assert response.status_code == 409
 
-    def test_get_warehouse(self, client, admin_user, sample_warehouse):
+    def test_get_warehouse(self, admin_client, sample_warehouse):
         """Test getting a specific warehouse."""
-        login(client, "admin", "password123")
-        response = client.get(f"/api/warehouses/{sample_warehouse['id']}")
+        response = admin_client.get(f"/api/warehouses/{sample_warehouse['id']}")
         assert response.status_code == 200
         data = json.loads(response.data)
         assert data["code"] == "WH-001"
 
-    def test_get_warehouse_not_found(self, client, admin_user):
+    def test_get_warehouse_not_found(self, admin_client):
         """Test getting a non-existent warehouse."""
-        login(client, "admin", "password123")
-        response = client.get("/api/warehouses/9999")
+        response = admin_client.get("/api/warehouses/9999")
         assert response.status_code == 404
 
-    def test_update_warehouse(self, client, admin_user, sample_warehouse):
+    def test_update_warehouse(self, admin_client, sample_warehouse):
         """Test updating a warehouse."""
-        login(client, "admin", "password123")
-        response = client.put(
+        response = admin_client.put(
             f"/api/warehouses/{sample_warehouse['id']}",
-            data=json.dumps({"name": "Updated Warehouse"}),
-            content_type="application/json",
+            json={"name": "Updated Warehouse"},
         )
         assert response.status_code == 200
         data = json.loads(response.data)
         assert data["name"] == "Updated Warehouse"
 
-    def test_delete_warehouse(self, client, admin_user, sample_warehouse):
+    def test_update_warehouse_duplicate_code(
+        self, admin_client, sample_warehouse
+    ):
+        """Test updating a warehouse to a code another warehouse uses."""
+        admin_client.post(
+            "/api/warehouses",
+            json={"name": "Other", "code": "WH-002"},
+        )
+        response = admin_client.put(
+            f"/api/warehouses/{sample_warehouse['id']}",
+            json={"code": "WH-002"},
+        )
+        assert response.status_code == 409
+
+        response = admin_client.get(f"/api/warehouses/{sample_warehouse['id']}")
+        assert json.loads(response.data)["code"] == "WH-001"
+
+    def test_update_warehouse_with_fetched_payload(
+        self, admin_client, sample_warehouse
+    ):
+        """Test that a payload returned by GET can be sent back as an update."""
+        url = f"/api/warehouses/{sample_warehouse['id']}"
+        payload = json.loads(admin_client.get(url).data)
+        payload["name"] = "Round Trip"
+        response = admin_client.put(url, json=payload)
+        assert response.status_code == 200
+        assert json.loads(response.data)["name"] == "Round Trip"
+
+    def test_delete_warehouse(self, admin_client, sample_warehouse):
         """Test deleting a warehouse."""
-        login(client, "admin", "password123")
-        response = client.delete(f"/api/warehouses/{sample_warehouse['id']}")
+        response = admin_client.delete(
+            f"/api/warehouses/{sample_warehouse['id']}"
+        )
         assert response.status_code == 204
 
+    def test_delete_warehouse_with_items(self, admin_client, sample_item):
+        """Test that a warehouse holding items cannot be deleted."""
+        response = admin_client.delete(f"/api/warehouses/{sample_item['warehouse_id']}")
+        assert response.status_code == 400
+
     def test_viewer_cannot_create_warehouse(self, client, viewer_user):
         """Test that viewers cannot create warehouses."""
-        login(client, "viewer", "password123")
+        login_as(client, viewer_user)
         response = client.post(
             "/api/warehouses",
-            data=json.dumps({"name": "New Warehouse", "code": "WH-NEW"}),
-            content_type="application/json",
+            json={"name": "New Warehouse", "code": "WH-NEW"},
         )
         assert response.status_code == 403
 
@@ -90,59 +132,114 @@ class TestWarehouseAPI:
 class TestItemAPI:
     """Test item API endpoints."""
 
-    def test_list_items(self, client, admin_user, sample_warehouse):
+    def test_list_items(self, admin_client, sample_warehouse):
         """Test listing items in a warehouse."""
-        login(client, "admin", "password123")
-        response = client.get(f"/api/warehouses/{sample_warehouse['id']}/items")
+        response = admin_client.get(
+            f"/api/warehouses/{sample_warehouse['id']}/items"
+        )
         assert response.status_code == 200
         data = json.loads(response.data)
         assert isinstance(data, list)
 
-    def test_create_item(self, client, admin_user, sample_warehouse):
+    def test_search_items(self, admin_client, sample_item):
+        """Test searching items by SKU and name."""
+        for term in ("item-001", "test item"):
+            response = admin_client.get(f"/api/items?search={term}")
+            assert [i["sku"] for i in json.loads(response.data)] == ["ITEM-001"]
+
+    def test_create_item(self, admin_client, sample_warehouse):
         """Test creating an item."""
-        login(client, "admin", "password123")
-        response = client.post(
+        response = admin_client.post(
             f"/api/warehouses/{sample_warehouse['id']}/items",
-            data=json.dumps(
-                {
-                    "sku": "NEW-001",
-                    "name": "New Item",
-                    "quantity": 50,
-                    "warehouse_id": sample_warehouse["id"],
-                }
-            ),
-            content_type="application/json",
+            json={
+                "sku": "NEW-001",
+                "name": "New Item",
+                "quantity": 50,
+                "warehouse_id": sample_warehouse["id"],
+            },
         )
         assert response.status_code == 201
         data = json.loads(response.data)
         assert data["sku"] == "NEW-001"
 
-    def test_get_item(self, client, admin_user, sample_item):
+    def test_create_item_negative_quantity(self, admin_client, sample_warehouse):
+        """Test that a negative quantity is rejected by the schema."""
+        response = admin_client.post(
+            f"/api/warehouses/{sample_warehouse['id']}/items",
+            json={
+                "sku": "NEG-001",
+                "name": "Negative",
+                "quantity": -1,
+                "warehouse_id": sample_warehouse["id"],
+            },
+        )
+        assert response.status_code == 400
+        assert json.loads(response.data)["error"] == {
+            "quantity": ["Quantity must be non-negative."]
+        }
+
+    def test_create_duplicate_item_is_not_audited(
+        self, admin_client, sample_item
+    ):
+        """Test that a failed item creation leaves no audit entry behind."""
+        response = admin_client.post(
+            f"/api/warehouses/{sample_item['warehouse_id']}/items",
+            json={
+                "sku": sample_item["sku"],
+                "name": "Duplicate",
+                "quantity": 1,
+                "warehouse_id": sample_item["warehouse_id"],
+            },
+        )
+        assert response.status_code == 400
+
+        audit = json.loads(admin_client.get("/api/audit").data)
+        assert audit["total"] == 0
+
+    def test_get_item(self, admin_client, sample_item):
         """Test getting a specific item."""
-        login(client, "admin", "password123")
-        response = client.get(
+        response = admin_client.get(
             f"/api/warehouses/{sample_item['warehouse_id']}/items/{sample_item['id']}"
         )
         assert response.status_code == 200
         data = json.loads(response.data)
         assert data["sku"] == "ITEM-001"
 
-    def test_update_item(self, client, admin_user, sample_item):
+    def test_get_item_includes_metadata(self, admin_client, sample_warehouse):
+        """Test that the deferred metadata column is still returned."""
+        url = f"/api/warehouses/{sample_warehouse['id']}/items"
+        created = json.loads(
+            admin_client.post(
+                url,
+                json={
+                    "sku": "META-001",
+                    "name": "With Metadata",
+                    "quantity": 1,
+                    "warehouse_id": sample_warehouse["id"],
+                    "metadata_json": {"colour": "red"},
+                },
+            ).data
+        )
+
+        response = admin_client.get(f"{url}/{created['id']}")
+        assert json.loads(response.data)["metadata_json"] == {"colour": "red"}
+
+        response = admin_client.get(url)
+        assert json.loads(response.data)[0]["metadata_json"] == {"colour": "red"}
+
+    def test_update_item(self, admin_client, sample_item):
         """Test updating an item."""
-        login(client, "admin", "password123")
-        response = client.put(
+        response = admin_client.put(
             f"/api/warehouses/{sample_item['warehouse_id']}/items/{sample_item['id']}",
-            data=json.dumps({"quantity": 150}),
-            content_type="application/json",
+            json={"quantity": 150},
         )
         assert response.status_code == 200
         data = json.loads(response.data)
         assert data["quantity"] == 150
 
-    def test_delete_item(self, client, admin_user, sample_item):
+    def test_delete_item(self, admin_client, sample_item):
         """Test deleting an item."""
-        login(client, "admin", "password123")
-        response = client.delete(
+        response = admin_client.delete(
             f"/api/warehouses/{sample_item['warehouse_id']}/items/{sample_item['id']}"
         )
         assert response.status_code == 204
@@ -151,60 +248,73 @@ class TestItemAPI:
 class TestTransferAPI:
     """Test transfer API endpoint."""
 
-    def test_transfer_item(self, client, admin_user, sample_item, app):
+    def test_transfer_item(self, admin_client, sample_item, dest_warehouse):
         """Test transferring an item between warehouses."""
-        from app import db
-        from app.models import Warehouse
+        response = admin_client.post(
+            "/api/transfers",
+            json={
+                "source_warehouse_id": sample_item["warehouse_id"],
+                "destination_warehouse_id": dest_warehouse["id"],
+                "item_id": sample_item["id"],
+                "quantity": 25,
+            },
+        )
+        assert response.status_code == 200
+        data = json.loads(response.data)
+        assert data["message"] == "Transfer successful"
+        assert data["source_item"]["quantity"] == 75
+        assert data["destination_item"]["quantity"] == 25
 
+    def test_transfer_merges_into_existing_item(
+        self, admin_client, sample_item, dest_warehouse, app
+    ):
+        """Test transferring into a warehouse that already stocks the SKU."""
         with app.app_context():
-            # Create destination warehouse
-            dest = Warehouse(name="Destination", code="WH-DEST")
-            db.session.add(dest)
+            db.session.add(
+                Item(warehouse_id=dest_warehouse["id"], sku="ITEM-001",
+                     name="Test Item", quantity=10.0)
+            )
             db.session.commit()
-            dest_id = dest.id
 
-        login(client, "admin", "password123")
-        response = client.post(
+        response = admin_client.post(
             "/api/transfers",
-            data=json.dumps(
-                {
-                    "source_warehouse_id": sample_item["warehouse_id"],
-                    "destination_warehouse_id": dest_id,
-                    "item_id": sample_item["id"],
-                    "quantity": 25,
-                }
-            ),
-            content_type="application/json",
+            json={
+                "source_warehouse_id": sample_item["warehouse_id"],
+                "destination_warehouse_id": dest_warehouse["id"],
+                "item_id": sample_item["id"],
+                "quantity": 25,
+            },
         )
         assert response.status_code == 200
         data = json.loads(response.data)
-        assert data["message"] == "Transfer successful"
+        assert data["source_item"]["quantity"] == 75
+        assert data["destination_item"]["quantity"] == 35
+
+    def test_transfer_to_same_warehouse(self, admin_client, sample_item):
+        """Test that an item cannot be transferred into its own warehouse."""
+        response = admin_client.post(
+            "/api/transfers",
+            json={
+                "source_warehouse_id": sample_item["warehouse_id"],
+                "destination_warehouse_id": sample_item["warehouse_id"],
+                "item_id": sample_item["id"],
+                "quantity": 25,
+            },
+        )
+        assert response.status_code == 400
 
     def test_transfer_insufficient_quantity(
-        self, client, admin_user, sample_item, app
+        self, admin_client, sample_item, dest_warehouse
     ):
         """Test transfer with insufficient quantity."""
-        from app import db
-        from app.models import Warehouse
-
-        with app.app_context():
-            dest = Warehouse(name="Destination", code="WH-DEST")
-            db.session.add(dest)
-            db.session.commit()
-            dest_id = dest.id
-
-        login(client, "admin", "password123")
-        response = client.post(
+        response = admin_client.post(
             "/api/transfers",
-            data=json.dumps(
-                {
-                    "source_warehouse_id": sample_item["warehouse_id"],
-                    "destination_warehouse_id": dest_id,
-                    "item_id": sample_item["id"],
-                    "quantity": 1000,  # More than available
-                }
-            ),
-            content_type="application/json",
+            json={
+                "source_warehouse_id": sample_item["warehouse_id"],
+                "destination_warehouse_id": dest_warehouse["id"],
+                "item_id": sample_item["id"],
+                "quantity": 1000,  # More than available
+            },
         )
         assert response.status_code == 400
 
@@ -212,11 +322,67 @@ class TestTransferAPI:
 class TestAuditAPI:
     """Test audit log API endpoint."""
 
-    def test_list_audit_logs(self, client, admin_user):
+    def test_list_audit_logs(self, admin_client):
         """Test listing audit logs."""
-        login(client, "admin", "password123")
-        response = client.get("/api/audit")
+        response = admin_client.get("/api/audit")
         assert response.status_code == 200
         data = json.loads(response.data)
         assert "items" in data
         assert "total" in data
+
+    def test_audit_logs_include_username(self, admin_client):
+        """Test that audit log entries include the acting user's name."""
+        admin_client.post(
+            "/api/warehouses",
+            json={"name": "New Warehouse", "code": "WH-NEW"},
+        )
+        response = admin_client.get("/api/audit")
+        assert response.status_code == 200
+        data = json.loads(response.data)
+        assert data["items"][0]["username"] == "admin"
+
+    def test_list_audit_logs_with_cursor(self, admin_client):
+        """Test paging through audit logs with the keyset cursor."""
+        for i in range(3):
+            admin_client.post(
+                "/api/warehouses",
+                json={"name": f"Warehouse {i}", "code": f"WH-{i}"},
+            )
+
+        first = json.loads(admin_client.get("/api/audit?per_page=2").data)
+        assert len(first["items"]) == 2
+        assert first["next_cursor"]
+
+        second = json.loads(
+            admin_client.get(
+                f"/api/audit?per_page=2&cursor={first['next_cursor']}"
+            ).data
+        )
+        assert len(second["items"]) == 1
+        assert second["next_cursor"] is None
+
+        ids = [log["id"] for log in first["items"] + second["items"]]
+        assert ids == sorted(ids, reverse=True)
+        assert len(set(ids)) == 3
+
+    def test_list_audit_logs_per_page_floor(self, admin_client):
+        """Test that a zero or negative page size returns one entry a page."""
+        for i in range(2):
+            admin_client.post(
+                "/api/warehouses",
+                json={"name": f"Warehouse {i}", "code": f"WH-{i}"},
+            )
+
+        first = json.loads(admin_client.get("/api/audit?per_page=0").data)
+        assert len(first["items"]) == 1
+
+        response = admin_client.get(
+            f"/api/audit?per_page=-5&cursor={first['next_cursor']}"
+        )
+        assert response.status_code == 200
+        assert len(json.loads(response.data)["items"]) == 1
+
+    def test_list_audit_logs_invalid_cursor(self, admin_client):
+        """Test that a malformed cursor is rejected."""
+        response = admin_client.get("/api/audit?cursor=not-a-cursor")
+        assert response.status_code == 400
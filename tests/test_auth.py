@@ -32,6 +32,11 @@ class TestAuth:
         response = login(client, "admin", "wrongpassword")
         assert b"Invalid username or password" in response.data
 
+    def test_login_unknown_user(self, client):
+        """Test login with a username that does not exist."""
+        response = login(client, "nobody", "password123")
+        assert b"Invalid username or password" in response.data
+
     def test_logout(self, client, admin_user):
         """Test logout."""
         login(client, "admin", "password123")
@@ -73,6 +78,46 @@ class TestAuth:
         )
         assert b"Username already exists" in response.data
 
+    def test_registration_duplicate_email(self, client, admin_user):
+        """Test registration with existing email."""
+        response = client.post(
+            "/auth/register",
+            data={
+                "username": "other",
+                "email": "admin@test.com",
+                "password": "password123",
+                "confirm_password": "password123",
+            },
+            follow_redirects=True,
+        )
+        assert b"Email already registered" in response.data
+
+    def test_deleted_user_is_logged_out(self, app, client, admin_user, viewer_user):
+        """Test that a deleted user's session stops working immediately."""
+        viewer_client = app.test_client()
+        login(viewer_client, "viewer", "password123")
+        assert viewer_client.get("/dashboard").status_code == 200
+
+        login(client, "admin", "password123")
+        client.post(f"/auth/users/{viewer_user['id']}/delete")
+
+        response = viewer_client.get("/dashboard", follow_redirects=True)
+        assert b"Please log in" in response.data
+
+    def test_user_cache_kept_until_commit(self, app, client, viewer_user):
+        """Test that a cached user is only dropped once a write commits."""
+        login(client, "viewer", "password123")
+        client.get("/dashboard")
+        cache = app.extensions["user_cache"]
+        assert viewer_user["id"] in cache
+
+        with app.app_context():
+            db.session.get(User, viewer_user["id"]).role = "admin"
+            db.session.flush()
+            assert viewer_user["id"] in cache
+            db.session.commit()
+        assert viewer_user["id"] not in cache
+
     def test_protected_route_requires_login(self, client):
         """Test that protected routes require login."""
         response = client.get("/dashboard", follow_redirects=True)
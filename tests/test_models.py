@@ -1,57 +1,75 @@
 """Tests for User model."""
 
 import pytest
-from app.models import User, Role
+from werkzeug.security import generate_password_hash
+from app.models import User, Role, secrets_match
 
 
 class TestUserModel:
     """Test User model."""
 
-    def test_set_password(self, app):
+    def test_set_password(self):
         """Test password hashing."""
-        with app.app_context():
-            user = User(username="test", email="test@test.com")
-            user.set_password("password123")
-            assert user.password_hash is not None
-            assert user.password_hash != "password123"
+        user = User(username="test", email="test@test.com")
+        user.set_password("password123")
+        assert user.password_hash is not None
+        assert user.password_hash != "password123"
 
-    def test_check_password(self, app):
+    def test_check_password(self):
         """Test password verification."""
-        with app.app_context():
-            user = User(username="test", email="test@test.com")
-            user.set_password("password123")
-            assert user.check_password("password123") is True
-            assert user.check_password("wrongpassword") is False
+        user = User(username="test", email="test@test.com")
+        user.set_password("password123")
+        assert user.check_password("password123") is True
+        assert user.check_password("wrongpassword") is False
 
-    def test_has_role(self, app):
+    def test_has_role(self):
         """Test role checking."""
-        with app.app_context():
-            user = User(username="test", email="test@test.com", role=Role.ADMIN.value)
-            assert user.has_role(Role.ADMIN) is True
-            assert user.has_role(Role.MANAGER) is False
-
-    def test_can_edit(self, app):
-        """Test edit permission."""
-        with app.app_context():
-            admin = User(username="admin", email="admin@test.com", role=Role.ADMIN.value)
-            manager = User(
-                username="manager", email="manager@test.com", role=Role.MANAGER.value
-            )
-            viewer = User(
-                username="viewer", email="viewer@test.com", role=Role.VIEWER.value
-            )
-
-            assert admin.can_edit() is True
-            assert manager.can_edit() is True
-            assert viewer.can_edit() is False
-
-    def test_can_delete(self, app):
-        """Test delete permission."""
-        with app.app_context():
-            admin = User(username="admin", email="admin@test.com", role=Role.ADMIN.value)
-            manager = User(
-                username="manager", email="manager@test.com", role=Role.MANAGER.value
-            )
-
-            assert admin.can_delete() is True
-            assert manager.can_delete() is False
+        user = User(username="test", email="test@test.com", role=Role.ADMIN.value)
+        assert user.has_role(Role.ADMIN) is True
+        assert user.has_role(Role.MANAGER) is False
+
+    @pytest.mark.parametrize(
+        "role,can_edit,can_delete",
+        [
+            (Role.ADMIN, True, True),
+            (Role.MANAGER, True, False),
+            (Role.VIEWER, False, False),
+        ],
+    )
+    def test_permissions(self, role, can_edit, can_delete):
+        """Test edit and delete permissions for each role."""
+        user = User(
+            username=role.value, email=f"{role.value}@test.com", role=role.value
+        )
+        assert user.can_edit() is can_edit
+        assert user.can_delete() is can_delete
+
+    def test_password_hash_uses_argon2(self):
+        """Test that new passwords are hashed with argon2id."""
+        user = User(username="test", email="test@test.com")
+        user.set_password("password123")
+        assert user.password_hash.startswith("$argon2id$")
+
+    def test_legacy_password_hash_is_upgraded(self):
+        """Test that a legacy Werkzeug hash still verifies and is upgraded."""
+        user = User(
+            username="test",
+            email="test@test.com",
+            # A single pbkdf2 round keeps the legacy check cheap
+            password_hash=generate_password_hash(
+                "password123", method="pbkdf2:sha256:1"
+            ),
+        )
+        assert user.check_password("wrongpassword") is False
+        assert user.check_password("password123") is True
+        assert user.password_hash.startswith("$argon2id$")
+
+
+class TestSecretsMatch:
+    """Test constant-time secret comparison."""
+
+    def test_secrets_match(self):
+        """Test matching and non-matching secrets."""
+        assert secrets_match("token", "token") is True
+        assert secrets_match("token", "tokem") is False
+        assert secrets_match(None, "token") is False
@@ -0,0 +1,49 @@
+"""Tests for the service layer."""
+
+from app import db
+from app.models import AuditLog, AuditType, User
+from app.services import AuditService, WarehouseService
+
+
+class TestWarehouseService:
+    """Test warehouse service."""
+
+    def test_get_by_id_leaves_items_unloaded(self, app_ctx, sample_item):
+        """Test that items are only loaded when asked for."""
+        warehouse = WarehouseService.get_by_id(sample_item["warehouse_id"])
+        assert "items" in db.inspect(warehouse).unloaded
+
+        db.session.expunge_all()
+        warehouse = WarehouseService.get_by_id(
+            sample_item["warehouse_id"], with_items=True
+        )
+        assert "items" not in db.inspect(warehouse).unloaded
+        assert [item.sku for item in warehouse.items] == [sample_item["sku"]]
+
+
+class TestAuditService:
+    """Test audit log service."""
+
+    def test_log_many(self, app_ctx, admin_user):
+        """Test that several entries are written in one call."""
+        user = db.session.get(User, admin_user["id"])
+        AuditService.log_many(
+            [
+                {"audit_type": AuditType.ADD, "user": user, "quantity": 5},
+                {"audit_type": "remove", "notes": "Cleared", "details": {"a": 1}},
+            ]
+        )
+        db.session.commit()
+
+        logs = db.session.query(AuditLog).order_by(AuditLog.id).all()
+        assert [log.type for log in logs] == ["add", "remove"]
+        assert logs[0].user_id == admin_user["id"]
+        assert logs[0].quantity == 5
+        assert logs[1].details_json == {"a": 1}
+        assert all(log.timestamp is not None for log in logs)
+
+    def test_log_many_empty(self, app_ctx):
+        """Test that an empty batch writes nothing."""
+        AuditService.log_many([])
+        db.session.commit()
+        assert db.session.query(AuditLog).count() == 0
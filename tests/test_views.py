@@ -0,0 +1,170 @@
+"""Tests for web UI routes."""
+
+import re
+
+from conftest import insert_rows
+from app import db, forget_dashboard
+from app.models import Item
+from app.routes import main as main_routes
+
+
+class TestDashboard:
+    """Test dashboard page."""
+
+    def test_dashboard_shows_item_counts(self, admin_client, sample_item):
+        """Test that the dashboard lists warehouses with their item counts."""
+        response = admin_client.get("/dashboard")
+        assert response.status_code == 200
+        assert b"Test Warehouse" in response.data
+        assert b"<td>1</td>" in response.data
+
+    def test_dashboard_low_stock_alerts(self, app, admin_client, sample_item):
+        """Test that every low stock item is counted but only ten are listed."""
+        insert_rows(app, Item, [
+            {"warehouse_id": sample_item["warehouse_id"], "sku": f"LOW-{i:02}",
+             "name": f"Low {i:02}", "quantity": i / 2}
+            for i in range(12)
+        ])
+
+        response = admin_client.get("/dashboard")
+        assert b"<h3>13</h3>" in response.data
+        assert b"<h3>12</h3>" in response.data
+        assert response.data.count(b'class="alert-item"') == 10
+        assert b"(LOW-00)" in response.data
+        assert b"(LOW-11)" not in response.data
+
+    def test_dashboard_cache_cleared_on_write(self, app, admin_client, sample_item):
+        """Test that the cached dashboard is rebuilt once an item changes."""
+        assert b"<h3>0</h3>" in admin_client.get("/dashboard").data
+
+        # Writes that bypass the ORM are only picked up after the TTL
+        with app.app_context():
+            db.session.execute(db.update(Item).values(quantity=1))
+            db.session.commit()
+        assert b"<h3>0</h3>" in admin_client.get("/dashboard").data
+
+        with app.app_context():
+            db.session.get(Item, sample_item["id"]).name = "Renamed"
+            db.session.commit()
+        response = admin_client.get("/dashboard")
+        assert b"<h3>0</h3>" not in response.data
+        assert b"Renamed" in response.data
+
+    def test_dashboard_cache_kept_until_commit(
+        self, app, admin_client, sample_item
+    ):
+        """Test that the cached dashboard is only dropped on commit."""
+        admin_client.get("/dashboard")
+        cache = app.extensions["dashboard_cache"]
+
+        with app.app_context():
+            db.session.get(Item, sample_item["id"]).quantity = 1
+            db.session.flush()
+            assert len(cache) == 1
+            db.session.rollback()
+        assert len(cache) == 1
+
+        with app.app_context():
+            db.session.get(Item, sample_item["id"]).quantity = 1
+            db.session.flush()
+            assert len(cache) == 1
+            db.session.commit()
+        assert len(cache) == 0
+
+    def test_dashboard_not_cached_across_commit(
+        self, app, admin_client, sample_item, monkeypatch
+    ):
+        """Test that figures built while a write commits are not cached."""
+        build = main_routes._dashboard_data
+
+        def build_then_commit():
+            data = build()
+            # What the after_commit hook of a concurrent write runs
+            forget_dashboard()
+            return data
+
+        monkeypatch.setattr(main_routes, "_dashboard_data", build_then_commit)
+        admin_client.get("/dashboard")
+        assert len(app.extensions["dashboard_cache"]) == 0
+
+        monkeypatch.undo()
+        admin_client.get("/dashboard")
+        assert len(app.extensions["dashboard_cache"]) == 1
+
+
+class TestWarehouseViews:
+    """Test warehouse pages."""
+
+    def test_list_warehouses(self, admin_client, sample_item):
+        """Test that the warehouse list shows item counts."""
+        response = admin_client.get("/warehouses/")
+        assert response.status_code == 200
+        assert b"WH-001" in response.data
+        assert b"<td>1</td>" in response.data
+
+    def test_view_warehouse(self, admin_client, sample_item):
+        """Test that the warehouse page lists its items."""
+        response = admin_client.get(
+            f"/warehouses/{sample_item['warehouse_id']}"
+        )
+        assert response.status_code == 200
+        assert b"ITEM-001" in response.data
+
+    def test_streamed_page_csrf_token(
+        self, app, admin_client, sample_warehouse, monkeypatch
+    ):
+        """Test that a streamed page's CSRF token is saved to the session."""
+        monkeypatch.setitem(app.config, "WTF_CSRF_ENABLED", True)
+        url = f"/warehouses/{sample_warehouse['id']}"
+        page = admin_client.get(url).get_data(as_text=True)
+        token = re.search(r'name="csrf_token" value="([^"]+)"', page).group(1)
+
+        response = admin_client.post(
+            f"{url}/delete", data={"csrf_token": token}
+        )
+        assert response.status_code == 302
+
+    def test_flash_shown_once_on_streamed_page(self, admin_client):
+        """Test that a flash rendered on a streamed page is not shown again."""
+        response = admin_client.post(
+            "/warehouses/create",
+            data={"name": "Streamed", "code": "WH-STR"},
+            follow_redirects=True,
+        )
+        assert b"created successfully" in response.data
+
+        response = admin_client.get(response.request.path)
+        assert b"created successfully" not in response.data
+
+    def test_create_warehouse_duplicate_code(self, admin_client, sample_warehouse):
+        """Test that a duplicate code re-renders the form with an error."""
+        response = admin_client.post(
+            "/warehouses/create",
+            data={"name": "Another", "code": "WH-001"},
+        )
+        assert response.status_code == 200
+        assert b"Warehouse code already exists" in response.data
+
+
+class TestItemViews:
+    """Test item pages."""
+
+    def test_search_items(self, admin_client, sample_item):
+        """Test that the search page lists and counts matching items."""
+        response = admin_client.get("/items/search?search=item-001")
+        assert response.status_code == 200
+        assert b"Found 1 item(s)" in response.data
+        assert b"ITEM-001" in response.data
+
+        response = admin_client.get("/items/search?search=missing")
+        assert b"No items found" in response.data
+
+    def test_transfer_form_excludes_source(
+        self, admin_client, sample_item, dest_warehouse
+    ):
+        """Test that the transfer form offers every warehouse but the source."""
+        response = admin_client.get(f"/items/{sample_item['id']}/transfer")
+        assert response.status_code == 200
+        assert b"Destination (WH-DEST)" in response.data
+        source_option = f'value="{sample_item["warehouse_id"]}"'.encode()
+        assert source_option not in response.data